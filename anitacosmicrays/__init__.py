@@ -5,17 +5,33 @@ Impulsive Transient Antenna (ANITA).
 """
 __version__ = "0.0.3"
 
-from . import anita4
+from . import anita4, cache, features, folding, matching, sources
 from .events import get_event, get_events
-from .responses import get_response
-from .waveforms import get_csw, get_deconvolved, get_waveforms
+from .features import summarize
+from .responses import (
+    get_average_response,
+    get_response,
+    get_responses,
+    select_channels,
+)
+from .waveforms import get_csw, get_deconvolved, get_waveforms, stack_waveforms
 
 __all__ = [
     "anita4",
+    "cache",
+    "features",
+    "folding",
+    "matching",
+    "sources",
     "get_event",
     "get_events",
     "get_waveforms",
     "get_csw",
     "get_response",
+    "get_responses",
+    "get_average_response",
+    "select_channels",
     "get_deconvolved",
+    "stack_waveforms",
+    "summarize",
 ]
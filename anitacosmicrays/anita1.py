@@ -2,18 +2,15 @@
 This file provides the event parameters for all cosmic ray and cosmic-ray
 like events observed by ANITA1.
 """
-from os.path import dirname, join
-
 import numpy as np
-from cachetools import cached
 
-__all__ = ["get_events"]
+from .cache import cached
+from .sources import get_source
 
-# the location of the events files
-DATA_DIR = join(dirname(dirname(__file__)), "data")
+__all__ = ["get_events"]
 
 
-@cached(cache={})
+@cached()
 def get_events() -> np.ndarray:
     """
     Return the structured array containing cosmic-ray-like
@@ -25,17 +22,18 @@ def get_events() -> np.ndarray:
         A NumPy structured array containing the events.
     """
 
-    events: np.ndarray = np.genfromtxt(
-        join(DATA_DIR, "a1events.dat"),
-        delimiter=",",
-        dtype=[
-            ("id", int),
-            ("event_lat", float),
-            ("event_lon", float),
-            ("elevation", float),
-            ("polarity", float),
-        ],
-    )
+    with get_source().open("a1events.dat") as f:
+        events: np.ndarray = np.genfromtxt(
+            f,
+            delimiter=",",
+            dtype=[
+                ("id", int),
+                ("event_lat", float),
+                ("event_lon", float),
+                ("elevation", float),
+                ("polarity", float),
+            ],
+        )
 
     # and return the loaded events
     return events
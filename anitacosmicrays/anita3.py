@@ -2,20 +2,17 @@
 This file provides the event parameters for all cosmic ray and cosmic-ray
 like events observed by ANITA3.
 """
-from os.path import dirname, join
-
 import numpy as np
-from cachetools import cached
 
 from . import waveforms
+from .cache import cached
+from .dtypes import DTypeLike
+from .sources import get_source
 
 __all__ = ["get_events", "get_deconvolved"]
 
-# the location of the events files
-DATA_DIR = join(dirname(dirname(__file__)), "data")
-
 
-@cached(cache={})
+@cached()
 def get_events() -> np.ndarray:
     """
     Return the structured array containing cosmic-ray-like
@@ -27,29 +24,30 @@ def get_events() -> np.ndarray:
         A NumPy structured array containing the events.
     """
 
-    events: np.ndarray = np.genfromtxt(
-        join(DATA_DIR, "a3events.dat"),
-        delimiter=",",
-        dtype=[
-            ("id", int),
-            ("time", int),
-            ("event_lat", float),
-            ("event_lon", float),
-            ("event_alt", float),
-            ("anita_lat", float),
-            ("anita_lon", float),
-            ("anita_alt", float),
-            ("elevation", float),
-            ("azimuth", float),
-            ("polarity", float),
-        ],
-    )
+    with get_source().open("a3events.dat") as f:
+        events: np.ndarray = np.genfromtxt(
+            f,
+            delimiter=",",
+            dtype=[
+                ("id", int),
+                ("time", int),
+                ("event_lat", float),
+                ("event_lon", float),
+                ("event_alt", float),
+                ("anita_lat", float),
+                ("anita_lon", float),
+                ("anita_alt", float),
+                ("elevation", float),
+                ("azimuth", float),
+                ("polarity", float),
+            ],
+        )
 
     # and return the loaded events
     return events
 
 
-def get_deconvolved(event: int) -> np.ndarray:
+def get_deconvolved(event: int, dtype: DTypeLike = np.float64) -> np.ndarray:
     """
     Return the deconvolved electric field waveform for a given
     A3 CR event.
@@ -58,6 +56,8 @@ def get_deconvolved(event: int) -> np.ndarray:
     ----------
     event: int
         The event ID to load.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveform i.e. np.float32.
 
     Returns
     -------
@@ -69,4 +69,4 @@ def get_deconvolved(event: int) -> np.ndarray:
     ValueError
         If the event number cannot be found for ANITA4.
     """
-    return waveforms.get_deconvolved(3, event)
+    return waveforms.get_deconvolved(3, event, dtype)
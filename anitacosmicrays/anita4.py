@@ -2,20 +2,17 @@
 This file provides the event parameters for all cosmic ray and cosmic-ray
 like events observed by ANITA4.
 """
-from os.path import dirname, join
-
 import numpy as np
-from cachetools import cached
 
 from . import waveforms
+from .cache import cached
+from .dtypes import DTypeLike
+from .sources import get_source
 
 __all__ = ["get_events", "get_waveforms", "get_csw"]
 
-# the location of the events files
-DATA_DIR = join(dirname(dirname(__file__)), "data")
-
 
-@cached(cache={})
+@cached()
 def get_events() -> np.ndarray:
     """
     Return the structured array containing cosmic-ray-like
@@ -27,30 +24,31 @@ def get_events() -> np.ndarray:
         A NumPy structured array containing the events.
     """
 
-    events: np.ndarray = np.loadtxt(
-        join(DATA_DIR, "a4events.dat"),
-        delimiter=",",
-        dtype=[
-            ("id", int),
-            ("date", "S20"),
-            ("time", "S20"),
-            ("event_lat", float),
-            ("event_lon", float),
-            ("event_alt", float),
-            ("anita_lat", float),
-            ("anita_lon", float),
-            ("anita_alt", float),
-            ("elevation", float),
-            ("azimuth", float),
-            ("polarity", float),
-        ],
-    )
+    with get_source().open("a4events.dat") as f:
+        events: np.ndarray = np.loadtxt(
+            f,
+            delimiter=",",
+            dtype=[
+                ("id", int),
+                ("date", "S20"),
+                ("time", "S20"),
+                ("event_lat", float),
+                ("event_lon", float),
+                ("event_alt", float),
+                ("anita_lat", float),
+                ("anita_lon", float),
+                ("anita_alt", float),
+                ("elevation", float),
+                ("azimuth", float),
+                ("polarity", float),
+            ],
+        )
 
     # and return the loaded events
     return events
 
 
-def get_waveforms(event: int) -> np.ndarray:
+def get_waveforms(event: int, dtype: DTypeLike = np.float64) -> np.ndarray:
     """
     Return the waveform for a given A4 CR event sampled at 20GSa/s.
 
@@ -58,6 +56,8 @@ def get_waveforms(event: int) -> np.ndarray:
     ----------
     event: int
         The event ID to load.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveform i.e. np.float32.
 
     Returns
     -------
@@ -71,12 +71,12 @@ def get_waveforms(event: int) -> np.ndarray:
     """
 
     # load waveforms
-    loaded_wvfms: np.ndarray = waveforms.get_waveforms(4, event)
+    loaded_wvfms: np.ndarray = waveforms.get_waveforms(4, event, dtype)
 
     return loaded_wvfms
 
 
-def get_csw(event: int) -> np.ndarray:
+def get_csw(event: int, dtype: DTypeLike = np.float64) -> np.ndarray:
     """
     Return the coherently summed waveform for a given
     A4 CR event sampled at 20GSa/s.
@@ -85,6 +85,8 @@ def get_csw(event: int) -> np.ndarray:
     ----------
     event: int
         The event ID to load.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveform i.e. np.float32.
 
     Returns
     -------
@@ -98,12 +100,12 @@ def get_csw(event: int) -> np.ndarray:
     """
 
     # load waveforms
-    csw: np.ndarray = waveforms.get_csw(4, event)
+    csw: np.ndarray = waveforms.get_csw(4, event, dtype)
 
     return csw
 
 
-def get_deconvolved(event: int) -> np.ndarray:
+def get_deconvolved(event: int, dtype: DTypeLike = np.float64) -> np.ndarray:
     """
     Return the deconvolved electric field waveform for a given
     A4 CR event.
@@ -112,6 +114,8 @@ def get_deconvolved(event: int) -> np.ndarray:
     ----------
     event: int
         The event ID to load.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveform i.e. np.float32.
 
     Returns
     -------
@@ -123,4 +127,4 @@ def get_deconvolved(event: int) -> np.ndarray:
     ValueError
         If the event number cannot be found for ANITA4.
     """
-    return waveforms.get_deconvolved(4, event)
+    return waveforms.get_deconvolved(4, event, dtype)
@@ -0,0 +1,146 @@
+"""
+This file provides a thread-safe memoizing decorator with per-key
+single-flight semantics for the data loaders.
+"""
+import functools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, cast
+
+from cachetools.keys import hashkey
+
+__all__ = ["cached", "clear_caches"]
+
+# every cache (and its in-flight calls) created by `cached` so that they
+# can be cleared together
+_CACHES: List[Tuple[Dict[Any, Any], Dict[Any, "_Call"], threading.Lock]] = []
+
+# incremented by `clear_caches` so that loads started before a clear
+# are not stored in the cache
+_GENERATION = 0
+
+# the lock protecting the registry of caches
+_REGISTRY_LOCK = threading.Lock()
+
+# the type of the functions that we memoize
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class _Call:
+    """
+    An in-flight call whose result is shared with every waiting thread.
+    """
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+def cached(key: Callable[..., Any] = hashkey) -> Callable[[F], F]:
+    """
+    Memoize a function with thread-safe, per-key single-flight semantics.
+
+    The first thread to request a key computes the value while any other
+    threads requesting the same key wait for (and share) its result.
+    Requests for different keys are computed in parallel. Exceptions are
+    propagated to every waiting thread and are not cached. Values whose
+    computation started before a call to `clear_caches` are returned to
+    their callers but are not stored in the cache.
+
+    Parameters
+    ----------
+    key: Callable[..., Any]
+        A function that maps the arguments of each call to a hashable key.
+
+    Returns
+    -------
+    decorator: Callable[[F], F]
+        The decorator that memoizes a given function.
+    """
+
+    def decorator(func: F) -> F:
+        # the cached values and in-flight calls for this function
+        cache: Dict[Any, Any] = {}
+        pending: Dict[Any, _Call] = {}
+        lock = threading.Lock()
+
+        # register this cache so that it can be cleared
+        with _REGISTRY_LOCK:
+            _CACHES.append((cache, pending, lock))
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            # construct the key for this call
+            k = key(*args, **kwargs)
+
+            with lock:
+                # check if we have already computed this key
+                try:
+                    return cache[k]
+                except KeyError:
+                    pass
+
+                # otherwise, check if another thread is computing it
+                call = pending.get(k)
+                leader = call is None
+                if call is None:
+                    call = pending[k] = _Call()
+
+            # if another thread is computing this key, wait for its result
+            if not leader:
+                call.event.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.value
+
+            # otherwise we compute the value ourselves - recording the
+            # generation of the caches before we start
+            generation = _GENERATION
+            try:
+                call.value = func(*args, **kwargs)
+            except BaseException as error:
+                call.error = error
+                raise
+            else:
+                # only store the value if the caches weren't cleared
+                with lock:
+                    if generation == _GENERATION:
+                        cache[k] = call.value
+            finally:
+                # and wake up every thread waiting on this key
+                with lock:
+                    if pending.get(k) is call:
+                        del pending[k]
+                call.event.set()
+
+            return call.value
+
+        def cache_clear() -> None:
+            """
+            Remove every value from the cache of this function.
+            """
+            with lock:
+                cache.clear()
+
+        wrapper.cache_clear = cache_clear  # type: ignore
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def clear_caches() -> None:
+    """
+    Remove every cached value from every loader in the package.
+
+    Loads that are in flight when the caches are cleared are not stored,
+    and later requests do not wait for them.
+    """
+    global _GENERATION
+
+    with _REGISTRY_LOCK:
+        _GENERATION += 1
+        for cache, pending, lock in _CACHES:
+            with lock:
+                cache.clear()
+                pending.clear()
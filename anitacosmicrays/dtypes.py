@@ -0,0 +1,41 @@
+"""
+This file provides helpers for the floating-point precision of returned arrays.
+"""
+from typing import Union
+
+import numpy as np
+
+__all__ = ["DTypeLike", "float_dtype"]
+
+# the types that we accept wherever a user can choose the precision of an array
+DTypeLike = Union[str, type, np.dtype]
+
+
+def float_dtype(dtype: DTypeLike) -> np.dtype:
+    """
+    Convert and validate a user-provided floating-point dtype.
+
+    Parameters
+    ----------
+    dtype: DTypeLike
+        The requested dtype i.e. np.float32, "float32", or float.
+
+    Returns
+    -------
+    dtype: np.dtype
+        The normalized NumPy dtype (usable as a cache key).
+
+    Raises
+    ------
+    ValueError
+        If the requested dtype is not a real floating-point type.
+    """
+
+    # convert it into a NumPy dtype
+    converted = np.dtype(dtype)
+
+    # and check that it is a real floating type
+    if not np.issubdtype(converted, np.floating):
+        raise ValueError(f"{dtype} is not a floating-point dtype.")
+
+    return converted
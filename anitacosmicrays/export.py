@@ -0,0 +1,688 @@
+"""
+This file provides bulk export of selected events and data products into a
+single self-describing file that can be reopened with memory mapping.
+
+The exported file contains the raw bytes of every array (each aligned to
+64 bytes) followed by a JSON footer that describes the dtype, shape, and
+offset of every array, the metadata of the export, and an index from event
+ID to row. The final 8 bytes store the offset of the footer.
+"""
+import argparse
+import json
+import operator
+import os
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+from numpy.lib import format as npformat
+from numpy.lib import recfunctions
+
+from . import events, responses, waveforms
+from .dtypes import DTypeLike, float_dtype
+from .sources import get_source
+
+__all__ = ["export", "open_export", "Export", "PRODUCTS", "main"]
+
+# the products that can be exported for each event
+PRODUCTS = ("waveforms", "csw", "deconvolved", "responses")
+
+# the magic bytes at the start of every exported file
+MAGIC = b"ACREXP01"
+
+# the alignment (in bytes) of every array in the file
+ALIGNMENT = 64
+
+# the loaders for each per-event product
+LOADERS = {
+    "waveforms": waveforms.get_waveforms,
+    "csw": waveforms.get_csw,
+    "deconvolved": waveforms.get_deconvolved,
+}
+
+# the data file of each per-event product
+FILENAMES = {
+    "waveforms": "anita{flight}/event{evid}.waveform",
+    "csw": "anita{flight}/csw{evid}.waveform",
+    "deconvolved": "anita{flight}/deconvolved{evid}.waveform",
+}
+
+# the ANITA-4 TUFF configurations exported with the "responses" product
+CONFIGS = (
+    "260_0_0",
+    "260_365_0",
+    "260_375_0",
+    "260_385_0",
+    "260_0_460",
+    "260_375_460",
+)
+
+
+def export(
+    filename: str,
+    flight: int,
+    evids: Optional[Sequence[int]] = None,
+    query: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    products: Optional[Sequence[str]] = None,
+    channels: Union[str, Sequence[str]] = "all",
+    configs: Sequence[str] = CONFIGS,
+    dtype: DTypeLike = np.float64,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Export a selection of events and products into a single file.
+
+    Every product is streamed into the file one event (or configuration)
+    at a time, bypassing the loader caches, so that memory usage does not
+    grow with the number of events. The file is only replaced once the
+    export has been written successfully. Each per-event product is stored
+    as an (n_events x n_samples) structured array with the same fields as
+    the corresponding loader.
+
+    Parameters
+    ----------
+    filename: str
+        The file to write the export into.
+    flight: int
+        The ANITA flight to export.
+    evids: Optional[Sequence[int]]
+        The event IDs to export or None for every event.
+    query: Optional[Callable[[np.ndarray], np.ndarray]]
+        A function that returns a boolean mask from the event table
+        i.e. `lambda events: events["elevation"] < -20`.
+    products: Optional[Sequence[str]]
+        The products (any of `PRODUCTS`) to export or None for every
+        per-event product that is available for the selected events.
+    channels: Union[str, Sequence[str]]
+        The channels of the "waveforms" and "responses" products to export,
+        a single channel label, or "all".
+    configs: Sequence[str]
+        The TUFF configurations of the "responses" product to export.
+    dtype: DTypeLike
+        The floating-point dtype of the exported waveforms and responses.
+    metadata: Optional[Dict[str, Any]]
+        Any additional JSON-serializable metadata to store in the file.
+
+    Returns
+    -------
+    nevents: int
+        The number of exported events.
+
+    Raises
+    ------
+    ValueError
+        If the selection is empty, a product is not available for every
+        selected event, no configurations are given for the "responses"
+        product, or the events of a product have different lengths.
+    """
+
+    # select the events that we want to export
+    table = _select(flight, evids, query)
+    ids = [int(evid) for evid in table["id"]]
+
+    # by default, we export every per-event product that is available
+    if products is None:
+        products = [product for product in LOADERS if _available(product, flight, ids)]
+
+    # check that the products are valid - removing any duplicates
+    products = tuple(dict.fromkeys(products))
+    unknown = [product for product in products if product not in PRODUCTS]
+    if unknown:
+        raise ValueError(f"Unknown products: {', '.join(unknown)}")
+
+    # check that every requested product is available
+    missing = [
+        product
+        for product in products
+        if product in LOADERS and not _available(product, flight, ids)
+    ]
+    if missing:
+        raise ValueError(
+            f"ANITA-{flight} does not provide {', '.join(missing)} "
+            "for every selected event."
+        )
+
+    # and that we have some configurations for the responses
+    if "responses" in products and not configs:
+        raise ValueError("At least one configuration must be requested.")
+
+    # normalize the dtype and channels
+    dtype = float_dtype(dtype)
+    if isinstance(channels, str) and channels != "all":
+        channels = (channels,)
+    selected = "all" if channels == "all" else tuple(channels)
+
+    # the description of every array in the file
+    arrays: Dict[str, Dict[str, Any]] = {}
+
+    # write into a temporary file in the same directory so that a failed
+    # export never leaves a truncated file or replaces an existing export
+    directory, basename = os.path.split(os.path.abspath(filename))
+    temporary = os.path.join(directory, f".{basename}.{uuid.uuid4().hex}.tmp")
+
+    try:
+        with open(temporary, "xb") as f:
+            f.write(MAGIC)
+
+            # write the event table
+            _write(f, arrays, "events", table.dtype, table.shape, [table])
+
+            # and every requested per-event product
+            for product in products:
+                if product == "responses":
+                    continue
+
+                # the fields of each event that we store
+                first = _load(product, flight, ids[0], selected, dtype)
+
+                # and stream the product into the file one event at a time
+                _write(
+                    f,
+                    arrays,
+                    product,
+                    first.dtype,
+                    (len(ids), first.size),
+                    (_load(product, flight, evid, selected, dtype) for evid in ids),
+                )
+
+            # and the responses for every configuration
+            if "responses" in products:
+                time, _, labels = _load_responses(flight, configs[0], selected, dtype)
+                _write(f, arrays, "responses_time", time.dtype, time.shape, [time])
+                _write(
+                    f,
+                    arrays,
+                    "responses",
+                    dtype,
+                    (len(configs), len(labels), time.size),
+                    (
+                        _load_responses(flight, config, labels, dtype)[1]
+                        for config in configs
+                    ),
+                )
+
+            # construct the footer that describes the file
+            footer = {
+                "version": 1,
+                "metadata": {
+                    "flight": flight,
+                    "products": [
+                        product for product in PRODUCTS if product in products
+                    ],
+                    "channels": selected if selected == "all" else list(selected),
+                    "configs": list(configs) if "responses" in products else [],
+                    "created": datetime.now(timezone.utc).isoformat(),
+                    **(metadata or {}),
+                },
+                "arrays": arrays,
+                "index": {str(evid): row for row, evid in enumerate(ids)},
+            }
+
+            # and write the footer and its offset
+            offset = f.tell()
+            f.write(json.dumps(footer).encode())
+            f.write(np.array(offset, dtype="<u8").tobytes())
+
+        # and move the completed export into place
+        os.replace(temporary, filename)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+    return len(ids)
+
+
+class Export:
+    """
+    A memory-mapped view of a file created with `export`.
+
+    Arrays are mapped directly from the file so that selecting individual
+    events does not read (or copy) any other event.
+
+    Parameters
+    ----------
+    filename: str
+        The exported file to open.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+
+        with open(filename, "rb") as f:
+
+            # check that this is an exported file
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{filename} is not an anitacosmicrays export.")
+
+            # find and read the footer
+            f.seek(-8, 2)
+            end = f.tell()
+            offset = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+            f.seek(offset)
+            footer = json.loads(f.read(end - offset).decode())
+
+        # the metadata of the export
+        self.metadata: Dict[str, Any] = footer["metadata"]
+
+        # the row of each event in the per-event arrays
+        self.index: Dict[int, int] = {
+            int(evid): row for evid, row in footer["index"].items()
+        }
+
+        # and memory-map every array
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.memmap(
+                filename,
+                dtype=npformat.descr_to_dtype(array["dtype"]),
+                mode="r",
+                offset=array["offset"],
+                shape=tuple(array["shape"]),
+            )
+            for name, array in footer["arrays"].items()
+        }
+
+    def __repr__(self) -> str:
+        return f"Export({self.filename!r})"
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._arrays
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        Return the memory-mapped array of a given product.
+        """
+        return self._arrays[name]
+
+    @property
+    def names(self) -> List[str]:
+        """
+        The names of every array stored in this export.
+        """
+        return list(self._arrays)
+
+    @property
+    def events(self) -> np.ndarray:
+        """
+        The structured array of the exported events.
+        """
+        return self._arrays["events"]
+
+    def get(self, product: str, evid: int) -> np.ndarray:
+        """
+        Return a product for a given event without copying.
+
+        Parameters
+        ----------
+        product: str
+            The per-event product to load i.e. "waveforms".
+        evid: int
+            The event ID to load.
+
+        Returns
+        -------
+        array: np.ndarray
+            The (memory-mapped) product for this event.
+
+        Raises
+        ------
+        ValueError
+            If the product is not a per-event product or the
+            event was not exported.
+        """
+        if product not in LOADERS:
+            raise ValueError(f"{product} is not a per-event product.")
+        if evid not in self.index:
+            raise ValueError(f"{evid} was not found in {self.filename}.")
+
+        array: np.ndarray = self._arrays[product][self.index[evid]]
+
+        return array
+
+
+def open_export(filename: str) -> Export:
+    """
+    Open a file created with `export` using memory mapping.
+
+    Parameters
+    ----------
+    filename: str
+        The exported file to open.
+
+    Returns
+    -------
+    export: Export
+        The memory-mapped export.
+    """
+    return Export(filename)
+
+
+def _select(
+    flight: int,
+    evids: Optional[Sequence[int]],
+    query: Optional[Callable[[np.ndarray], np.ndarray]],
+) -> np.ndarray:
+    """
+    Select the events to export from the event table of a flight.
+
+    Parameters
+    ----------
+    flight: int
+        The ANITA flight to select events from.
+    evids: Optional[Sequence[int]]
+        The event IDs to select or None for every event.
+    query: Optional[Callable[[np.ndarray], np.ndarray]]
+        A function that returns a boolean mask from the event table.
+
+    Returns
+    -------
+    selected: np.ndarray
+        The selected rows of the event table.
+    """
+
+    # start with every event in the flight
+    table: np.ndarray = events.get_events(flight)
+    mask = np.ones(table.size, dtype=bool)
+
+    # select the requested event IDs
+    if evids is not None:
+        missing = [evid for evid in evids if evid not in table["id"]]
+        if missing:
+            raise ValueError(f"Unable to find {missing} in ANITA-{flight}")
+        mask &= np.isin(table["id"], evids)
+
+    # and apply the query
+    if query is not None:
+        mask &= np.asarray(query(table), dtype=bool)
+
+    # check that we have selected something
+    if not np.any(mask):
+        raise ValueError(f"No events in ANITA-{flight} match the selection.")
+
+    selected: np.ndarray = table[mask]
+
+    return selected
+
+
+def _available(product: str, flight: int, evids: Sequence[int]) -> bool:
+    """
+    Check whether a per-event product is available for every event.
+
+    Parameters
+    ----------
+    product: str
+        The per-event product to check.
+    flight: int
+        The ANITA flight of the events.
+    evids: Sequence[int]
+        The event IDs to check.
+
+    Returns
+    -------
+    available: bool
+        True if the product can be loaded for every event.
+    """
+    source = get_source()
+    return all(
+        source.exists(FILENAMES[product].format(flight=flight, evid=evid))
+        for evid in evids
+    )
+
+
+def _load(
+    product: str,
+    flight: int,
+    evid: int,
+    channels: Union[str, Sequence[str]],
+    dtype: np.dtype,
+) -> np.ndarray:
+    """
+    Load a per-event product bypassing the loader caches.
+
+    Parameters
+    ----------
+    product: str
+        The product to load.
+    flight: int
+        The ANITA flight to load.
+    evid: int
+        The event ID to load.
+    channels: Union[str, Sequence[str]]
+        The channels of the "waveforms" product to keep.
+    dtype: np.dtype
+        The floating-point dtype of the product.
+
+    Returns
+    -------
+    array: np.ndarray
+        The contiguous structured array for this event.
+    """
+
+    # use the undecorated loader so that we don't fill the caches
+    loader = LOADERS[product]
+    array: np.ndarray = getattr(loader, "__wrapped__", loader)(flight, evid, dtype)
+
+    # and select the requested channels
+    if product == "waveforms" and channels != "all":
+        unknown = [ch for ch in channels if ch not in (array.dtype.names or ())]
+        if unknown:
+            raise ValueError(f"Unknown channels: {', '.join(unknown)}")
+        array = recfunctions.repack_fields(array[["time", *channels]])
+
+    return array
+
+
+def _load_responses(
+    flight: int, config: str, channels: Union[str, Sequence[str]], dtype: np.dtype
+) -> Tuple[np.ndarray, np.ndarray, Tuple[str, ...]]:
+    """
+    Load the responses of a configuration bypassing the loader caches.
+
+    Parameters
+    ----------
+    flight: int
+        The ANITA flight to load.
+    config: str
+        The TUFF configuration to load.
+    channels: Union[str, Sequence[str]]
+        The channels to keep or "all".
+    dtype: np.dtype
+        The floating-point dtype of the responses.
+
+    Returns
+    -------
+    time: np.ndarray
+        The sample times (in ns) of the responses.
+    block: np.ndarray
+        The (n_channels x n_samples) responses.
+    channels: Tuple[str, ...]
+        The channel label of each row of `block`.
+    """
+
+    # validate the channels
+    selected = responses._channel_tuple(channels)
+
+    # use the undecorated loader so that we don't fill the caches
+    loader = getattr(responses._load_block, "__wrapped__", responses._load_block)
+    time, block, available = loader(flight, config, dtype)
+
+    # and select the requested channels
+    missing = [channel for channel in selected if channel not in available]
+    if missing:
+        raise FileNotFoundError(
+            f"No A{flight}:{config} responses for: {', '.join(missing)}"
+        )
+
+    return time, block[[available.index(ch) for ch in selected], :], selected
+
+
+def _write(
+    f: IO[bytes],
+    arrays: Dict[str, Dict[str, Any]],
+    name: str,
+    dtype: np.dtype,
+    shape: Sequence[int],
+    chunks: Iterable[np.ndarray],
+) -> None:
+    """
+    Stream an array into the file in chunks along its first axis.
+
+    Parameters
+    ----------
+    f: IO[bytes]
+        The file to write into.
+    arrays: Dict[str, Dict[str, Any]]
+        The description of every array in the file (updated in place).
+    name: str
+        The name of the array.
+    dtype: np.dtype
+        The dtype of the array.
+    shape: Sequence[int]
+        The shape of the full array.
+    chunks: Iterable[np.ndarray]
+        The chunks of the array along its first axis.
+
+    Raises
+    ------
+    ValueError
+        If the chunks don't match the dtype or shape of the array.
+    """
+
+    # pad the file so that the array is aligned
+    f.write(b"\0" * (-f.tell() % ALIGNMENT))
+    offset = f.tell()
+
+    # the number of bytes that we expect to write
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+    # write every chunk
+    for chunk in chunks:
+        if chunk.dtype != dtype:
+            raise ValueError(f"Inconsistent dtype in {name}: {chunk.dtype}.")
+        f.write(np.ascontiguousarray(chunk).tobytes())
+
+    # check that we wrote the full array
+    if f.tell() - offset != nbytes:
+        raise ValueError(f"The events of {name} have different lengths.")
+
+    # and save the description of this array
+    arrays[name] = {
+        "dtype": npformat.dtype_to_descr(np.dtype(dtype)),
+        "shape": list(shape),
+        "offset": offset,
+    }
+
+
+# the comparison operators supported in command-line queries
+OPERATORS = {
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+
+
+def _parse_where(condition: str) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Parse a command-line condition of the form "FIELD OP VALUE".
+
+    Parameters
+    ----------
+    condition: str
+        The condition i.e. "elevation < -20".
+
+    Returns
+    -------
+    query: Callable[[np.ndarray], np.ndarray]
+        A function that returns a boolean mask from the event table.
+    """
+
+    # split the condition into its field, operator, and value
+    match = re.fullmatch(r"\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(.+?)\s*", condition)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid condition '{condition}'.")
+    field, op, value = match.groups()
+
+    def query(table: np.ndarray) -> np.ndarray:
+        column = table[field]
+        target = value.encode() if column.dtype.kind == "S" else float(value)
+        mask: np.ndarray = OPERATORS[op](column, target)
+        return mask
+
+    return query
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Export events and products from the command line.
+
+    Parameters
+    ----------
+    argv: Optional[Sequence[str]]
+        The command-line arguments (defaults to sys.argv).
+    """
+    parser = argparse.ArgumentParser(
+        prog="anitacosmicrays-export",
+        description="Export ANITA cosmic-ray events and products into one file.",
+    )
+    parser.add_argument("filename", help="the file to export into")
+    parser.add_argument("--flight", type=int, required=True, help="the ANITA flight")
+    parser.add_argument("--events", type=int, nargs="+", help="the event IDs to export")
+    parser.add_argument(
+        "--where",
+        type=_parse_where,
+        action="append",
+        default=[],
+        help="select events with a condition i.e. 'elevation < -20'",
+    )
+    parser.add_argument(
+        "--products",
+        nargs="+",
+        choices=PRODUCTS,
+        help="the products to export (default: every available per-event product)",
+    )
+    parser.add_argument("--channels", nargs="+", help="the channels to export")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS))
+    parser.add_argument("--dtype", default="float64", help="i.e. float32")
+    args = parser.parse_args(argv)
+
+    # combine every condition into a single query
+    conditions = args.where
+
+    def query(table: np.ndarray) -> np.ndarray:
+        mask = np.ones(table.size, dtype=bool)
+        for condition in conditions:
+            mask &= condition(table)
+        return mask
+
+    nevents = export(
+        args.filename,
+        args.flight,
+        evids=args.events,
+        query=query,
+        products=args.products,
+        channels=args.channels or "all",
+        configs=args.configs,
+        dtype=args.dtype,
+    )
+
+    print(f"Exported {nevents} ANITA-{args.flight} events to {args.filename}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+This file provides per-event summary features computed over whole flights.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import events, waveforms
+from .cache import cached
+from .responses import CHANNELS
+
+__all__ = ["summarize", "hilbert_envelope", "FEATURES", "CHANNELS", "ANTENNAS"]
+
+# the features that we currently support
+FEATURES = (
+    "peak_to_peak",
+    "envelope",
+    "rms",
+    "snr",
+    "polarization",
+    "csw_polarization",
+)
+
+# the antenna for each H/V pair of channels in `CHANNELS`
+ANTENNAS = tuple(channel[:3] for channel in CHANNELS[::2])
+
+
+def summarize(
+    flight: int, features: Optional[Sequence[str]] = None, noise_window: float = 20.0
+) -> np.ndarray:
+    """
+    Compute summary features for every event in a flight.
+
+    Every feature is computed in a single vectorized operation across all
+    events and channels. The following features are supported:
+
+     - "peak_to_peak": the peak-to-peak amplitude of each channel (mV).
+     - "envelope": the peak of the Hilbert envelope of each channel (mV).
+     - "rms": the RMS of each channel in the pre-pulse region (mV).
+     - "snr": the peak-to-peak divided by twice the pre-pulse RMS.
+     - "polarization": the linear polarization angle (degrees) of each antenna
+       computed from the Stokes parameters of its H/V channels.
+     - "csw_polarization": the linear polarization angle (degrees) of the
+       H-pol and V-pol coherently summed waveforms.
+
+    Per-channel features are stored in the order of `CHANNELS` and
+    per-antenna features in the order of `ANTENNAS`. Results are cached and
+    every call returns its own copy that can be modified in place.
+
+    Parameters
+    ----------
+    flight: int
+        The ANITA flight to summarize.
+    features: Optional[Sequence[str]]
+        The features to compute or None for every feature. Repeated
+        features are only computed once.
+    noise_window: float
+        The duration (in ns) at the start of each waveform used as the
+        pre-pulse noise region.
+
+    Returns
+    -------
+    summary: np.ndarray
+        A NumPy structured array with the fields of `get_events` and
+        a field for every requested feature.
+
+    Raises
+    ------
+    ValueError
+        If an unknown feature is requested or waveforms are not
+        available for this flight.
+    """
+
+    # convert the features into a hashable key without any duplicates
+    if isinstance(features, str):
+        features = (features,)
+    selected = FEATURES if features is None else tuple(dict.fromkeys(features))
+
+    # check that every feature is valid
+    unknown = [feature for feature in selected if feature not in FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(unknown)}")
+
+    # the summaries are cached so every caller gets their own copy
+    summary: np.ndarray = _summarize(flight, selected, float(noise_window)).copy()
+
+    return summary
+
+
+@cached()
+def _summarize(
+    flight: int, features: Tuple[str, ...], noise_window: float
+) -> np.ndarray:
+    """
+    Compute the cached summary features - see `summarize`.
+    """
+    if flight != 4:
+        raise ValueError("We currently only provide waveforms for ANITA-4")
+
+    # load the event table for this flight
+    table: np.ndarray = events.get_events(flight)
+    evids = [int(evid) for evid in table["id"]]
+
+    # the features that we compute for every channel
+    computed: Dict[str, np.ndarray] = {}
+
+    # the waveforms are only needed for the channel features
+    if set(features) - {"csw_polarization"}:
+
+        # load every waveform in a single block
+        time, block, _ = waveforms.stack_waveforms(flight, evids, CHANNELS)
+
+        # the pre-pulse noise region
+        noise = time < time[0] + noise_window
+
+        # compute the basic per-channel features
+        p2p = np.ptp(block, axis=-1)
+        rms = np.sqrt(np.mean(block[..., noise] ** 2, axis=-1))
+
+        computed["peak_to_peak"] = p2p
+        computed["rms"] = rms
+        computed["snr"] = p2p / (2.0 * rms)
+
+        # only compute the envelope if we need to
+        if "envelope" in features:
+            computed["envelope"] = np.max(hilbert_envelope(block), axis=-1)
+
+        # and compute the polarization angle of each antenna
+        computed["polarization"] = _polarization(block[:, 0::2], block[:, 1::2])
+
+    # the CSW polarization angles
+    if "csw_polarization" in features:
+        csws = [waveforms.get_csw(flight, evid) for evid in evids]
+        computed["csw_polarization"] = _polarization(
+            np.stack([csw["HPOL"] for csw in csws]),
+            np.stack([csw["VPOL"] for csw in csws]),
+        )
+
+    # construct the dtype of the summary table
+    dtype = table.dtype.descr + [
+        (feature, float, computed[feature].shape[1:]) for feature in features
+    ]
+
+    # and copy the events and features into the table
+    summary = np.zeros(table.size, dtype=dtype)
+    for name in table.dtype.names or ():
+        summary[name] = table[name]
+    for feature in features:
+        summary[feature] = computed[feature]
+
+    return summary
+
+
+def hilbert_envelope(signals: np.ndarray) -> np.ndarray:
+    """
+    Compute the Hilbert envelope along the last axis of an array.
+
+    Parameters
+    ----------
+    signals: np.ndarray
+        The real-valued signals with shape (..., n_samples).
+
+    Returns
+    -------
+    envelope: np.ndarray
+        The magnitude of the analytic signal with the same shape as `signals`.
+    """
+
+    # the number of samples in each signal
+    N = signals.shape[-1]
+
+    # the weights that zero the negative frequencies of the spectrum
+    weights = np.zeros(N)
+    weights[0] = 1.0
+    half = (N + 1) // 2
+    weights[1:half] = 2.0
+    if N % 2 == 0:
+        weights[N // 2] = 1.0
+
+    # and compute the analytic signal with a batched FFT
+    analytic = np.fft.ifft(np.fft.fft(signals, axis=-1) * weights, axis=-1)
+
+    return np.abs(analytic)
+
+
+def _polarization(hpol: np.ndarray, vpol: np.ndarray) -> np.ndarray:
+    """
+    Compute the linear polarization angle (in degrees) from H/V signals.
+
+    Parameters
+    ----------
+    hpol: np.ndarray
+        The H-pol signals with shape (..., n_samples).
+    vpol: np.ndarray
+        The V-pol signals with shape (..., n_samples).
+
+    Returns
+    -------
+    angle: np.ndarray
+        The polarization angle (from H towards V) with shape (...).
+    """
+
+    # compute the Stokes parameters
+    Q = np.sum(hpol ** 2 - vpol ** 2, axis=-1)
+    U = np.sum(2.0 * hpol * vpol, axis=-1)
+
+    angle: np.ndarray = np.degrees(0.5 * np.arctan2(U, Q))
+
+    return angle
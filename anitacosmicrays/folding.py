@@ -0,0 +1,356 @@
+"""
+This file provides forward-folding of electric fields through the
+per-channel impulse responses onto the ANITA digitizer grid.
+"""
+from fractions import Fraction
+from typing import Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import responses
+from .cache import cached
+from .dtypes import DTypeLike, float_dtype
+
+__all__ = ["fold", "fold_ensemble", "DIGITIZER_FS"]
+
+# the sample rate of the ANITA digitizer in GSa/s
+DIGITIZER_FS = 2.6
+
+
+def fold(
+    time: np.ndarray,
+    fields: np.ndarray,
+    flight: int = 4,
+    config: Union[str, Sequence[str]] = "260_0_0",
+    channels: Union[str, Sequence[str]] = "all",
+    fs: float = DIGITIZER_FS,
+    noise: Optional[Union[float, np.ndarray]] = None,
+    seed: Optional[int] = None,
+    memory: int = 2 ** 28,
+    dtype: DTypeLike = np.float64,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fold a batch of electric fields through the channel impulse responses.
+
+    The fields are interpolated onto the 10 GSa/s grid of the impulse
+    responses and convolved with every channel and configuration in the
+    frequency domain. The result is resampled onto a grid at `fs`
+    by truncating (or zero-padding) the spectrum, which also acts as an
+    ideal anti-aliasing filter. Fields are processed in chunks so that the
+    intermediate spectra never exceed approximately `memory` bytes.
+
+    Parameters
+    ----------
+    time: np.ndarray
+        The uniformly spaced sample times (in ns) of the fields.
+    fields: np.ndarray
+        The (n_fields x n_samples) electric fields (in mV/m) i.e. the "field"
+        of `get_deconvolved`. A 1D array is treated as a single field.
+    flight: int
+        The ANITA flight to load the responses for.
+    config: Union[str, Sequence[str]]
+        The TUFF configuration (or configurations) to fold through.
+    channels: Union[str, Sequence[str]]
+        The channel labels to fold through or "all" for every channel.
+    fs: float
+        The sample rate (in GSa/s) of the folded waveforms.
+    noise: Optional[Union[float, np.ndarray]]
+        If provided, the RMS (in mV) of Gaussian white noise added to every
+        waveform. An array is broadcast against (n_configs x n_channels).
+    seed: Optional[int]
+        The seed of the random number generator used for the noise.
+    memory: int
+        The approximate maximum size (in bytes) of the intermediate
+        spectra for each chunk of fields.
+    dtype: DTypeLike
+        The floating-point dtype of the folded waveforms i.e. np.float32.
+
+    Returns
+    -------
+    times: np.ndarray
+        The sample times (in ns) of the folded waveforms.
+    waveforms: np.ndarray
+        The (n_fields x n_configs x n_channels x n_times) folded waveforms (mV).
+
+    Raises
+    ------
+    ValueError
+        If the fields are not uniformly sampled or the responses are invalid.
+    """
+
+    # convert the arguments into hashable and validated values
+    dtype = float_dtype(dtype)
+    configs = (config,) if isinstance(config, str) else tuple(config)
+    _, _, selected = responses.get_responses(flight, configs[0], channels, dtype)
+
+    # make sure that we have a 2D array of fields
+    fields = np.atleast_2d(np.asarray(fields, dtype=dtype))
+    time = np.asarray(time, dtype=np.float64)
+
+    # interpolate the fields onto the sample times of the responses
+    resampled = _interpolate(time, fields, 1.0 / responses.FS)
+
+    # the FFT length required for a linear convolution onto the output grid
+    ratio = Fraction(fs / responses.FS).limit_denominator(1000)
+    length = resampled.shape[-1] + int(round(responses.DURATION * responses.FS)) - 1
+    nfft = ratio.denominator * -(-length // ratio.denominator)
+    nout = nfft * ratio.numerator // ratio.denominator
+
+    # get the (cached) spectra of every response
+    bank = _response_spectra(flight, configs, selected, nfft, dtype)
+
+    # the number of output frequencies that we keep (or zero-pad to)
+    nkeep = min(bank.shape[-1], nout // 2 + 1)
+
+    # the number of fields that we can fold at once within our memory limit
+    nbytes = bank.size * np.dtype(bank.dtype).itemsize
+    chunk = max(1, memory // max(1, nbytes))
+
+    # allocate the output array once
+    waveforms = np.zeros(
+        (fields.shape[0], len(configs), len(selected), nout), dtype=dtype
+    )
+
+    for start in range(0, fields.shape[0], chunk):
+        stop = min(start + chunk, fields.shape[0])
+
+        # compute the spectra of this chunk of fields
+        spectra = np.fft.rfft(resampled[start:stop], n=nfft, axis=-1)
+
+        # convolve with every response
+        folded = spectra[:, None, None, :nkeep] * bank[None, :, :, :nkeep]
+
+        # and transform back onto the output grid - the change in the FFT
+        # length requires us to rescale the amplitude
+        waveforms[start:stop] = np.fft.irfft(folded, n=nout, axis=-1) * (nout / nfft)
+
+    # add noise if requested
+    if noise is not None:
+        rng = np.random.default_rng(seed)
+        waveforms += _noise(rng, waveforms.shape, noise, dtype)
+
+    # and construct the output times
+    times = time[0] + np.arange(nout) / fs
+
+    return times.astype(dtype), waveforms
+
+
+def fold_ensemble(
+    time: np.ndarray,
+    field: np.ndarray,
+    realizations: int,
+    noise: Union[float, np.ndarray],
+    seed: Optional[int] = None,
+    memory: int = 2 ** 28,
+    flight: int = 4,
+    config: Union[str, Sequence[str]] = "260_0_0",
+    channels: Union[str, Sequence[str]] = "all",
+    fs: float = DIGITIZER_FS,
+    dtype: DTypeLike = np.float64,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Generate noisy realizations of a folded electric field in chunks.
+
+    The field is folded through the responses once (see `fold`) and chunks of
+    independent noise realizations are added to it so that each chunk is
+    at most approximately `memory` bytes.
+
+    Parameters
+    ----------
+    time: np.ndarray
+        The uniformly spaced sample times (in ns) of the field.
+    field: np.ndarray
+        The electric field (in mV/m) to fold.
+    realizations: int
+        The total number of noise realizations to generate.
+    noise: Union[float, np.ndarray]
+        The RMS (in mV) of the Gaussian white noise added to every
+        waveform. An array is broadcast against (n_configs x n_channels).
+    seed: Optional[int]
+        The seed of the random number generator - the full ensemble is
+        reproducible for a given seed, independent of the chunk size.
+    memory: int
+        The approximate maximum size (in bytes) of each chunk.
+    flight: int
+        The ANITA flight to load the responses for.
+    config: Union[str, Sequence[str]]
+        The TUFF configuration (or configurations) to fold through.
+    channels: Union[str, Sequence[str]]
+        The channel labels to fold through or "all" for every channel.
+    fs: float
+        The sample rate (in GSa/s) of the folded waveforms.
+    dtype: DTypeLike
+        The floating-point dtype of the folded waveforms i.e. np.float32.
+
+    Yields
+    ------
+    times: np.ndarray
+        The sample times (in ns) of the folded waveforms.
+    waveforms: np.ndarray
+        The (n_chunk x n_configs x n_channels x n_times) noisy waveforms (mV).
+    """
+
+    # fold the noiseless field through the responses once
+    times, signal = fold(
+        time, np.ravel(field), flight, config, channels, fs, dtype=dtype
+    )
+
+    # the number of realizations that we can generate at once
+    chunk = max(1, memory // max(1, signal.nbytes))
+
+    # spawn one generator per realization so the ensemble doesn't
+    # depend on the chunk size
+    streams = np.random.SeedSequence(seed).spawn(realizations)
+
+    for start in range(0, realizations, chunk):
+        stop = min(start + chunk, realizations)
+
+        # allocate this chunk with the noiseless signal
+        waveforms = np.repeat(signal, stop - start, axis=0)
+
+        # and add the noise for each realization
+        for i, stream in enumerate(streams[start:stop]):
+            rng = np.random.default_rng(stream)
+            waveforms[i] += _noise(rng, signal.shape[1:], noise, signal.dtype)
+
+        yield times, waveforms
+
+
+def _noise(
+    rng: np.random.Generator,
+    shape: Tuple[int, ...],
+    rms: Union[float, np.ndarray],
+    dtype: np.dtype,
+) -> np.ndarray:
+    """
+    Generate Gaussian white noise with a given RMS.
+
+    Parameters
+    ----------
+    rng: np.random.Generator
+        The random number generator to use.
+    shape: Tuple[int, ...]
+        The shape of the noise with (..., n_configs, n_channels, n_times).
+    rms: Union[float, np.ndarray]
+        The RMS of the noise, broadcast against (n_configs x n_channels).
+    dtype: np.dtype
+        The floating-point dtype of the noise.
+
+    Returns
+    -------
+    noise: np.ndarray
+        The generated noise.
+    """
+
+    # generate unit-variance noise directly in the requested precision
+    noise: np.ndarray = rng.standard_normal(shape, dtype=dtype)
+
+    # and scale it by the RMS of each channel
+    noise *= np.asarray(rms, dtype=dtype)[..., None]
+
+    return noise
+
+
+def _interpolate(time: np.ndarray, fields: np.ndarray, dt: float) -> np.ndarray:
+    """
+    Linearly interpolate a batch of uniformly sampled fields onto a new
+    sampling period starting at the same time.
+
+    Parameters
+    ----------
+    time: np.ndarray
+        The uniformly spaced sample times of the fields.
+    fields: np.ndarray
+        The (n_fields x n_samples) fields.
+    dt: float
+        The new sampling period.
+
+    Returns
+    -------
+    resampled: np.ndarray
+        The (n_fields x n_resampled) interpolated fields.
+
+    Raises
+    ------
+    ValueError
+        If the fields are not uniformly sampled.
+    """
+
+    # check that we have a valid time axis
+    if time.size < 2 or time.size != fields.shape[-1]:
+        raise ValueError("The time axis must match the last axis of the fields.")
+
+    # the average sampling period of the fields
+    step = (time[-1] - time[0]) / (time.size - 1)
+
+    # check that the fields are uniformly sampled - the stored times are
+    # rounded so we only require that they are close to a uniform grid
+    uniform = time[0] + step * np.arange(time.size)
+    if np.any(np.abs(time - uniform) > 0.25 * step):
+        raise ValueError("The fields must be uniformly sampled.")
+
+    # the number of new samples that fit within the fields (including the
+    # final sample) - the tolerance absorbs rounding of the stored times
+    nsamples = int(np.floor((time[-1] - time[0]) / dt + 1e-9)) + 1
+
+    # the fractional index of every new sample in the original fields
+    position = np.arange(nsamples) * dt / step
+    lower = np.minimum(position.astype(int), time.size - 2)
+    fraction = (position - lower).astype(fields.dtype)
+
+    # and interpolate every field at once
+    resampled: np.ndarray = (
+        fields[:, lower] * (1 - fraction) + fields[:, lower + 1] * fraction
+    )
+
+    return resampled
+
+
+@cached()
+def _response_spectra(
+    flight: int,
+    configs: Tuple[str, ...],
+    channels: Tuple[str, ...],
+    nfft: int,
+    dtype: np.dtype,
+) -> np.ndarray:
+    """
+    Compute the (cached) spectra of the impulse responses.
+
+    The spectra are scaled by the sampling period of the responses so that
+    the discrete convolution has units of mV.
+
+    Parameters
+    ----------
+    flight: int
+       The ANITA flight to load the responses for.
+    configs: Tuple[str, ...]
+       The TUFF configurations to load.
+    channels: Tuple[str, ...]
+       The channel labels to load.
+    nfft: int
+       The FFT length of the spectra.
+    dtype: np.dtype
+       The floating-point dtype of the responses.
+
+    Returns
+    -------
+    spectra: np.ndarray
+        The (n_configs x n_channels x n_freqs) response spectra.
+    """
+
+    # load the responses for every configuration into a single block
+    block = np.stack(
+        [
+            responses.get_responses(flight, config, channels, dtype)[1]
+            for config in configs
+        ]
+    )
+
+    # the sampling period of the responses
+    dt = 1.0 / responses.FS
+
+    # and compute the spectra of every response at once
+    spectra: np.ndarray = np.fft.rfft(block, n=nfft, axis=-1) * dt
+
+    return spectra
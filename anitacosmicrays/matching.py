@@ -0,0 +1,219 @@
+"""
+This file provides batched FFT cross-correlation of waveforms against
+a bank of templates for template matching across channels and events.
+"""
+from typing import NamedTuple, Tuple, Union
+
+import numpy as np
+
+__all__ = ["TemplateBank", "prepare_templates", "match_templates"]
+
+
+class TemplateBank(NamedTuple):
+    """
+    A bank of templates with precomputed spectra for cross-correlation.
+
+    Attributes
+    ----------
+    spectra: np.ndarray
+        The (n_templates x n_freqs) conjugated, normalized template spectra.
+    length: int
+        The number of samples in each template.
+    nsamples: int
+        The number of samples in the waveforms these spectra were computed for.
+    nfft: int
+        The FFT length used for the cross-correlation.
+    """
+
+    spectra: np.ndarray
+    length: int
+    nsamples: int
+    nfft: int
+
+
+def prepare_templates(templates: np.ndarray, nsamples: int) -> TemplateBank:
+    """
+    Precompute the spectra of a bank of templates.
+
+    The templates are mean-subtracted and normalized to unit norm so that
+    the spectra can be reused for every call to `match_templates` with
+    waveforms of length `nsamples`.
+
+    Parameters
+    ----------
+    templates: np.ndarray
+        The (n_templates x n_template_samples) templates sampled at the same
+        rate as the waveforms. A 1D array is treated as a single template.
+    nsamples: int
+        The number of samples in each waveform that will be matched.
+
+    Returns
+    -------
+    bank: TemplateBank
+        The precomputed template bank.
+
+    Raises
+    ------
+    ValueError
+        If any template is constant (has zero norm) or is longer than
+        the waveforms.
+    """
+
+    # make sure that we have a 2D floating-point array of templates
+    templates = np.atleast_2d(templates)
+    if not np.issubdtype(templates.dtype, np.floating):
+        templates = templates.astype(np.float64)
+
+    # subtract the mean and normalize every template
+    centered = templates - templates.mean(axis=-1, keepdims=True)
+    norms = np.linalg.norm(centered, axis=-1, keepdims=True)
+
+    # check that we don't have any constant templates
+    if np.any(norms == 0):
+        raise ValueError("Unable to normalize a constant template.")
+
+    # check that the templates fit within the waveforms
+    length = templates.shape[-1]
+    if length > nsamples:
+        raise ValueError(f"Templates of {length} samples exceed {nsamples} samples.")
+
+    # we only correlate at lags where the template lies entirely within the
+    # waveform so these never wrap around a circular correlation
+    nfft = _next_power_of_two(nsamples)
+
+    # and compute the conjugated spectra of the normalized templates
+    spectra = np.conj(np.fft.rfft(centered / norms, n=nfft, axis=-1))
+
+    return TemplateBank(spectra, length, nsamples, nfft)
+
+
+def match_templates(
+    templates: Union[TemplateBank, np.ndarray],
+    waveforms: np.ndarray,
+    memory: int = 2 ** 28,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the peak normalized cross-correlation of every waveform
+    against every template.
+
+    At each lag, the template is correlated against the window of the
+    waveform that it overlaps, and the result is normalized by the energy
+    of that (mean-subtracted) window. An exact, scaled copy of a template
+    therefore has a correlation of 1 independent of the waveform length.
+    Only lags where the template lies entirely within the waveform are
+    considered.
+
+    The correlations are computed with batched real FFTs and the windowed
+    energies with cumulative sums. The waveforms are processed in chunks so
+    that the intermediate correlation array never exceeds approximately
+    `memory` bytes.
+
+    Parameters
+    ----------
+    templates: Union[TemplateBank, np.ndarray]
+        A template bank from `prepare_templates` or a
+        (n_templates x n_template_samples) array of templates.
+    waveforms: np.ndarray
+        The waveforms with shape (..., n_samples) i.e. a stacked
+        (n_events x n_channels x n_samples) block from `stack_waveforms`.
+    memory: int
+        The approximate maximum size (in bytes) of the intermediate
+        correlations for each chunk.
+
+    Returns
+    -------
+    peaks: np.ndarray
+        The (..., n_templates) normalized cross-correlation at the lag
+        with the largest absolute correlation (between -1 and 1).
+    lags: np.ndarray
+        The (..., n_templates) lag (in samples) of each peak i.e. the sample
+        of the waveform aligned with the start of the template.
+
+    Raises
+    ------
+    ValueError
+        If the template bank was prepared for a different waveform length.
+    """
+
+    # flatten the waveforms into a 2D array of signals
+    waveforms = np.asarray(waveforms)
+    nsamples: int = waveforms.shape[-1]
+    signals: np.ndarray = waveforms.reshape((-1, nsamples))
+
+    # precompute the template spectra if we weren't given a bank
+    bank = (
+        templates
+        if isinstance(templates, TemplateBank)
+        else prepare_templates(templates, nsamples)
+    )
+
+    # check that the bank matches the waveforms
+    if bank.nsamples != nsamples:
+        raise ValueError(
+            f"Templates were prepared for {bank.nsamples} samples, got {nsamples}."
+        )
+
+    # the number of templates in the bank and the number of lags
+    ntemplates = bank.spectra.shape[0]
+    length = bank.length
+    nlags = nsamples - length + 1
+
+    # the number of signals we can correlate at once within our memory limit
+    itemsize = np.dtype(bank.spectra.dtype).itemsize
+    chunk = max(1, memory // (ntemplates * bank.nfft * itemsize))
+
+    # allocate the output arrays once
+    peaks = np.zeros((signals.shape[0], ntemplates), dtype=bank.spectra.real.dtype)
+    lags = np.zeros((signals.shape[0], ntemplates), dtype=np.int64)
+
+    for start in range(0, signals.shape[0], chunk):
+        stop = min(start + chunk, signals.shape[0])
+
+        # mean-subtract this chunk of signals - this keeps the windowed
+        # sums below small so that their difference is accurate
+        chunked = signals[start:stop]
+        centered = chunked - chunked.mean(axis=-1, keepdims=True)
+
+        # compute the spectra of the signals
+        spectra = np.fft.rfft(centered, n=bank.nfft, axis=-1)
+
+        # and correlate every signal against every template - as the templates
+        # have zero mean, this is also the correlation with each window after
+        # subtracting the mean of the window
+        correlation = np.fft.irfft(
+            spectra[:, None, :] * bank.spectra[None, :, :], n=bank.nfft, axis=-1
+        )[..., :nlags]
+
+        # the sum and energy of the window under the template at every lag
+        zero = np.zeros_like(centered[:, :1])
+        sums = np.cumsum(np.concatenate([zero, centered], axis=-1), axis=-1)
+        squares = np.cumsum(np.concatenate([zero, centered ** 2], axis=-1), axis=-1)
+        windowed = sums[:, length:] - sums[:, :nlags]
+        energy = squares[:, length:] - squares[:, :nlags]
+
+        # the norm of each mean-subtracted window - windows whose energy is
+        # below the precision of the signal energy are treated as empty
+        norms = np.sqrt(np.maximum(energy - windowed ** 2 / length, 0.0))
+        tiny = np.sqrt(np.finfo(norms.dtype).eps * squares[:, -1:])
+        norms[norms <= tiny] = np.inf
+
+        # normalize the correlation by the energy in each window
+        correlation /= norms[:, None, :]
+
+        # find the location of the peak correlation
+        imax = np.argmax(np.abs(correlation), axis=-1)
+
+        # and save the peak value and lag
+        peaks[start:stop] = np.take_along_axis(correlation, imax[..., None], -1)[..., 0]
+        lags[start:stop] = imax
+
+    # and restore the leading dimensions of the waveforms
+    shape = waveforms.shape[:-1] + (ntemplates,)
+    return peaks.reshape(shape), lags.reshape(shape)
+
+
+def _next_power_of_two(n: int) -> int:
+    """
+    Return the smallest power of two that is greater than or equal to `n`.
+    """
+    return 1 << max(0, int(n) - 1).bit_length()
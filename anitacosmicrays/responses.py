@@ -1,17 +1,41 @@
-from os.path import dirname, join
-from typing import Optional
+from typing import Optional, Sequence, Tuple, Union
 
 import numpy as np
 
-__all__ = ["get_response"]
+from .cache import cached
+from .dtypes import DTypeLike, float_dtype
+from .sources import get_source
 
+__all__ = [
+    "get_response",
+    "get_responses",
+    "get_average_response",
+    "select_channels",
+    "CHANNELS",
+]
 
-# the directory where we store impulse responses
-RESPONSE_DIR = join(dirname(dirname(__file__)), *("data", "responses"))
+
+# the sample rate that all responses are currently stored at in GSa/s
+FS = 10.0
+
+# we want the first 100 ns of each response
+DURATION = 100.0
+
+# every ANITA-4 channel in the same order as the columns of the waveform files
+CHANNELS = tuple(
+    f"{phi:02}{ring}{pol}"
+    for ring in ["T", "M", "B"]
+    for phi in range(1, 17)
+    for pol in ["H", "V"]
+)
 
 
 def get_response(
-    flight: int, channel: str, config: str = "260_0_0", pol: Optional[str] = None
+    flight: int,
+    channel: str,
+    config: str = "260_0_0",
+    pol: Optional[str] = None,
+    dtype: DTypeLike = np.float64,
 ) -> np.ndarray:
     """
     Load impulse responses for ANITA flight.
@@ -42,52 +66,429 @@ def get_response(
        The ANITA flight to load the responses for.
     pol: Optional[str]
        If channel="average", the polarization to load or None.
+    dtype: DTypeLike
+       The floating-point dtype of the returned response i.e. np.float32.
 
     Returns
     -------
     impulse: np.ndarray
         The impulse response/effective height in m/s sampled at 10 GSa/s.
     """
+
+    # the parsed responses are cached so every caller gets their own copy
+    response: np.ndarray = _load_response(
+        flight, channel, config, pol, float_dtype(dtype)
+    ).copy()
+
+    return response
+
+
+@cached()
+def _load_response(
+    flight: int, channel: str, config: str, pol: Optional[str], dtype: np.dtype
+) -> np.ndarray:
+    """
+    Load and cache a single impulse response - see `get_response`.
+    """
     if flight != 4:
         raise ValueError("We currently only provide responses for ANITA-4")
 
     # get the directory for this flight
-    load_dir = join(RESPONSE_DIR, f"anita{flight}")
+    load_dir = f"responses/anita{flight}"
 
     # if the user asks for an average
     if channel == "average":
         if pol:  # check if a user provided a polarization
-            filename = join(load_dir, *("averages", f"notches_{config}_{pol}.imp"))
+            filename = f"{load_dir}/averages/notches_{config}_{pol}.imp"
         else:
-            filename = join(load_dir, *("averages", f"notches_{config}.imp"))
+            filename = f"{load_dir}/averages/notches_{config}.imp"
     else:
-        filename = join(load_dir, *(f"notches_{config}", f"{channel}.imp"))
+        filename = f"{load_dir}/notches_{config}/{channel}.imp"
 
-    # load the impulse response - these are stored calibrated and ready to use
-    # we load these into a NumPy Structured array
-    raw: np.ndarray = np.loadtxt(filename, delimiter=" ")
+    # load the impulse response and return it as a structured array
+    time, response = _load_impulses(
+        [filename], [f"A{flight}:{channel}:{config}"], dtype
+    )
 
-    # the sample rate that all responses are currently stored at in GSa/s
-    fs = 10.0
-    dt = 1.0 / fs  # the sampling period (in ns)
+    # construct the array
+    data = np.zeros(time.size, dtype=[("time", time.dtype), ("response", time.dtype)])
+    data["time"] = time
+    data["response"] = response[0, :]
 
-    # get the sample rate of the data stored in the response file
-    stored_dt: float = raw[1, 0] - raw[0, 0]
+    # and return the structured array
+    return data
 
-    # check that the sample rate in the file is correct
-    if np.abs(stored_dt - dt) > 1e-6:
-        raise ValueError(f"A{flight}:{channel}:{config} not stored at 10 GSa/s.")
 
-    # we want the first 100 ns of each response
-    duration = 100
+def select_channels(
+    phi: Optional[Union[int, Sequence[int]]] = None,
+    ring: Optional[Sequence[str]] = None,
+    pol: Optional[Sequence[str]] = None,
+) -> Tuple[str, ...]:
+    """
+    Return the labels of every channel matching a given selection.
 
-    # get the number of samples
-    N = int(round(duration * fs))
+    Any argument that is None matches every value, i.e.
+    `select_channels(ring="T", pol="H")` returns the 16 top-ring H-pol channels.
 
-    # construct the arra
-    data = np.zeros(N, dtype=[("time", float), ("response", float)])
-    data["time"] = raw[0:N, 0]
-    data["response"] = raw[0:N, 1]
+    Parameters
+    ----------
+    phi: Optional[Union[int, Sequence[int]]]
+        The phi sectors (1 to 16) to select.
+    ring: Optional[Sequence[str]]
+        The rings ("T", "M", "B") to select.
+    pol: Optional[Sequence[str]]
+        The polarizations ("H", "V") to select.
 
-    # and convert it into an XArray DataArray
+    Returns
+    -------
+    channels: Tuple[str, ...]
+        The selected channel labels in the order of `CHANNELS`.
+    """
+
+    # allow users to pass a single phi sector (including NumPy integers)
+    if isinstance(phi, (int, np.integer)):
+        phi = [int(phi)]
+
+    return tuple(
+        channel
+        for channel in CHANNELS
+        if (phi is None or int(channel[:2]) in phi)
+        and (ring is None or channel[2] in ring)
+        and (pol is None or channel[3] in pol)
+    )
+
+
+def get_average_response(
+    flight: int,
+    channels: Union[str, Sequence[str]] = "all",
+    config: str = "260_0_0",
+    weights: Optional[Sequence[float]] = None,
+    domain: str = "time",
+    dtype: DTypeLike = np.float64,
+) -> np.ndarray:
+    """
+    Compute the (weighted) average impulse response over a set of channels.
+
+    The responses for every requested channel are loaded into a single
+    (n_channels x n_samples) block and averaged in one operation. Results
+    are cached by flight, channel set, configuration, and weights, and every
+    call returns its own copy.
+
+    Parameters
+    ----------
+    flight: int
+       The ANITA flight to load the responses for.
+    channels: Union[str, Sequence[str]]
+       The channel labels to average over or "all" for the whole payload.
+    config: str
+       The TUFF configuration to load the responses for.
+    weights: Optional[Sequence[float]]
+       Optional weight for each channel in `channels` (must not sum to zero).
+    domain: str
+       "time" to return the average impulse response or "frequency"
+       to return the average complex frequency response.
+    dtype: DTypeLike
+       The floating-point dtype of the returned response i.e. np.float32.
+
+    Returns
+    -------
+    average: np.ndarray
+        If domain="time", a structured array with "time" (ns) and "response"
+        fields. If domain="frequency", a structured array with "freq" (GHz)
+        and complex "response" fields.
+
+    Raises
+    ------
+    ValueError
+        If the channels, weights or domain are invalid.
+    """
+    if domain not in ["time", "frequency"]:
+        raise ValueError(f"Unknown domain '{domain}' - must be 'time' or 'frequency'.")
+
+    # convert the channels and weights into hashable keys for the cache
+    selected = _channel_tuple(channels)
+    key = None if weights is None else tuple(float(w) for w in weights)
+
+    # the averages are cached so every caller gets their own copy
+    average: np.ndarray = _average_response(
+        flight, selected, config, key, domain, float_dtype(dtype)
+    ).copy()
+
+    return average
+
+
+@cached()
+def _average_response(
+    flight: int,
+    channels: Tuple[str, ...],
+    config: str,
+    weights: Optional[Tuple[float, ...]],
+    domain: str,
+    dtype: np.dtype,
+) -> np.ndarray:
+    """
+    Compute the cached average response - see `get_average_response`.
+    """
+
+    # load every channel into a single block
+    time, block, _ = get_responses(flight, config, channels, dtype)
+
+    # check that the weights match the channels
+    if weights is not None and len(weights) != len(channels):
+        raise ValueError(
+            f"Got {len(weights)} weights for {len(channels)} channels in A{flight}."
+        )
+    if weights is not None and sum(weights) == 0:
+        raise ValueError("The weights must not sum to zero.")
+
+    # and compute the average over every channel in one go
+    # we cast the weights so that we don't promote float32 blocks
+    mean: np.ndarray = np.average(
+        block, axis=0, weights=None if weights is None else np.asarray(weights, dtype)
+    )
+
+    # if we want the time-domain response, we are done
+    if domain == "time":
+        data = np.zeros(time.size, dtype=[("time", dtype), ("response", dtype)])
+        data["time"] = time
+        data["response"] = mean
+        return data
+
+    # otherwise, the average complex spectrum is the transform of the average
+    # response as the Fourier transform is linear
+    spectrum = np.fft.rfft(mean) / FS
+    data = np.zeros(
+        spectrum.size,
+        dtype=[("freq", dtype), ("response", np.result_type(dtype, np.complex64))],
+    )
+    data["freq"] = np.fft.rfftfreq(mean.size, d=1.0 / FS)
+    data["response"] = spectrum
     return data
+
+
+def _channel_tuple(channels: Union[str, Sequence[str]]) -> Tuple[str, ...]:
+    """
+    Convert a channel specification into a validated tuple of channel labels.
+
+    Parameters
+    ----------
+    channels: Union[str, Sequence[str]]
+       The channel labels, a single channel label, or "all".
+
+    Returns
+    -------
+    channels: Tuple[str, ...]
+        The requested channel labels.
+
+    Raises
+    ------
+    ValueError
+        If no channels, or an unknown channel, are requested.
+    """
+    if isinstance(channels, str):
+        channels = CHANNELS if channels == "all" else (channels,)
+
+    # convert to a tuple so we can use it as a cache key
+    selected = tuple(channels)
+
+    # check that we actually got some channels
+    if not selected:
+        raise ValueError("At least one channel must be requested.")
+
+    # and check that they are all valid
+    unknown = [channel for channel in selected if channel not in CHANNELS]
+    if unknown:
+        raise ValueError(f"Unknown channels: {', '.join(unknown)}")
+
+    return selected
+
+
+def get_responses(
+    flight: int,
+    config: str = "260_0_0",
+    channels: Union[str, Sequence[str]] = "all",
+    dtype: DTypeLike = np.float64,
+) -> Tuple[np.ndarray, np.ndarray, Tuple[str, ...]]:
+    """
+    Load the impulse responses for many channels in a single call.
+
+    The responses of every channel in a configuration are parsed once into
+    one contiguous (n_channels x n_samples) array that shares a common time
+    axis and is cached as a unit; subsets of channels are indexed out of
+    this block. The block can be passed directly to batched FFTs
+    (i.e. `np.fft.rfft(block, axis=-1)`). The returned arrays are read-only
+    - copy them before modifying them in place.
+
+    Parameters
+    ----------
+    flight: int
+       The ANITA flight to load the responses for.
+    config: str
+       The TUFF configuration to load the responses for.
+    channels: Union[str, Sequence[str]]
+       The channel labels to load or "all" for every channel.
+    dtype: DTypeLike
+       The floating-point dtype of the returned arrays i.e. np.float32.
+
+    Returns
+    -------
+    time: np.ndarray
+        The sample times (in ns) shared by every response.
+    block: np.ndarray
+        The (n_channels x n_samples) impulse responses sampled at 10 GSa/s.
+    channels: Tuple[str, ...]
+        The channel label of each row of `block`.
+
+    Raises
+    ------
+    ValueError
+        If the flight or channels are invalid.
+    FileNotFoundError
+        If a requested channel is not available in the data source.
+    """
+
+    # validate the channels
+    selected = _channel_tuple(channels)
+
+    # load the cached block for every channel in this configuration
+    time, block, available = _load_block(flight, config, float_dtype(dtype))
+
+    # if we want every channel, we can return the cached block directly
+    if selected == available:
+        return time, block, selected
+
+    # check that every requested channel is available
+    missing = [channel for channel in selected if channel not in available]
+    if missing:
+        raise FileNotFoundError(
+            f"No A{flight}:{config} responses for: {', '.join(missing)}"
+        )
+
+    # and otherwise copy the requested rows out of the block
+    subset = block[[available.index(channel) for channel in selected], :]
+    subset.flags.writeable = False
+
+    return time, subset, selected
+
+
+@cached()
+def _load_block(
+    flight: int, config: str, dtype: np.dtype
+) -> Tuple[np.ndarray, np.ndarray, Tuple[str, ...]]:
+    """
+    Load the impulse responses of every available channel into a single array.
+
+    The returned arrays are read-only as they are shared by every caller.
+
+    Parameters
+    ----------
+    flight: int
+       The ANITA flight to load the responses for.
+    config: str
+       The TUFF configuration to load the responses for.
+    dtype: np.dtype
+       The floating-point dtype to parse the responses into.
+
+    Returns
+    -------
+    time: np.ndarray
+        The sample times (in ns) shared by every response.
+    block: np.ndarray
+        The (n_channels x n_samples) array of impulse responses.
+    channels: Tuple[str, ...]
+        The channel label of each row of `block`.
+    """
+    if flight != 4:
+        raise ValueError("We currently only provide responses for ANITA-4")
+
+    # get the directory for this configuration
+    load_dir = f"responses/anita{flight}/notches_{config}"
+
+    # find every channel that is available in the data source
+    source = get_source()
+    channels = tuple(
+        channel for channel in CHANNELS if source.exists(f"{load_dir}/{channel}.imp")
+    )
+
+    # check that we found some responses
+    if not channels:
+        raise FileNotFoundError(f"No A{flight}:{config} responses were found.")
+
+    # and load every channel in one go
+    time, block = _load_impulses(
+        [f"{load_dir}/{channel}.imp" for channel in channels],
+        [f"A{flight}:{channel}:{config}" for channel in channels],
+        dtype,
+    )
+
+    # the block is shared by every caller so make sure it can't be modified
+    time.flags.writeable = False
+    block.flags.writeable = False
+
+    return time, block, channels
+
+
+def _load_impulses(
+    filenames: Sequence[str], labels: Sequence[str], dtype: np.dtype
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load and validate a set of impulse response files into a single array.
+
+    Parameters
+    ----------
+    filenames: Sequence[str]
+        The names of the impulse response files in the data source.
+    labels: Sequence[str]
+        A human-readable label for each response used in errors.
+    dtype: np.dtype
+        The floating-point dtype to parse the responses into.
+
+    Returns
+    -------
+    time: np.ndarray
+        The first 100 ns of sample times (in ns).
+    block: np.ndarray
+        The (n_files x n_samples) first 100 ns of each impulse response.
+
+    Raises
+    ------
+    ValueError
+        If the responses are not stored at 10 GSa/s, are shorter than
+        100 ns, or are sampled at different times.
+    """
+
+    # the sampling period (in ns)
+    dt = 1.0 / FS
+
+    # get the number of samples
+    N = int(round(DURATION * FS))
+
+    # allocate the block of responses once
+    time = np.zeros(N, dtype=dtype)
+    block = np.zeros((len(filenames), N), dtype=dtype)
+
+    # and parse every file into its own row of the block
+    source = get_source()
+    for i, (filename, label) in enumerate(zip(filenames, labels)):
+
+        # load the impulse response - these are stored calibrated and ready to use
+        with source.open(filename) as f:
+            raw: np.ndarray = np.loadtxt(f, delimiter=" ", dtype=dtype, ndmin=2)
+
+        # check that we have at least 100 ns of response
+        if raw.shape[0] < N:
+            raise ValueError(f"{label} contains less than {DURATION} ns.")
+
+        # check that the sample rate in the file is correct
+        if np.abs((raw[1, 0] - raw[0, 0]) - dt) > 1e-6:
+            raise ValueError(f"{label} not stored at 10 GSa/s.")
+
+        # the first response defines the shared time axis
+        if i == 0:
+            time[:] = raw[0:N, 0]
+        elif np.any(raw[0:N, 0] != time):
+            raise ValueError(f"{label} is sampled at different times to {labels[0]}.")
+
+        block[i, :] = raw[0:N, 1]
+
+    return time, block
@@ -0,0 +1,297 @@
+"""
+This file provides pluggable sources for the ANITA data files.
+
+By default, data is loaded from the `data` directory distributed with this
+package. A different directory, or a single zip/tar archive that is read in
+place without extraction, can be selected with the `ANITACOSMICRAYS_DATA`
+environment variable or with `set_source`.
+"""
+import abc
+import io
+import os
+import re
+import tarfile
+import threading
+import zipfile
+from os.path import dirname, isdir, join
+from typing import IO, Dict, FrozenSet, Optional, Union
+
+from . import cache
+
+__all__ = [
+    "DataSource",
+    "DirectorySource",
+    "ArchiveSource",
+    "open_source",
+    "get_source",
+    "set_source",
+    "ENVIRONMENT_VARIABLE",
+]
+
+# the environment variable used to select the data source
+ENVIRONMENT_VARIABLE = "ANITACOSMICRAYS_DATA"
+
+# the data directory distributed with this package
+PACKAGE_DATA_DIR = join(dirname(dirname(__file__)), "data")
+
+# the top-level directories used by the data files themselves
+_LAYOUT = re.compile(r"anita\d+|responses")
+
+
+class DataSource(abc.ABC):
+    """
+    A read-only collection of data files identified by their relative
+    path i.e. "anita4/event4098827.waveform".
+
+    Every file in the source is indexed once when the source is opened so
+    that checking for, and opening, files does not touch the filesystem
+    more than necessary.
+    """
+
+    def __init__(self, names: FrozenSet[str]) -> None:
+        self._names = names
+
+    @property
+    def names(self) -> FrozenSet[str]:
+        """
+        The relative path of every file in this source.
+        """
+        return self._names
+
+    def exists(self, name: str) -> bool:
+        """
+        Check whether a file is present in this source.
+
+        Parameters
+        ----------
+        name: str
+            The relative path of the file (using "/" as the separator).
+
+        Returns
+        -------
+        exists: bool
+            True if the file is present in this source.
+        """
+        return name in self._names
+
+    def open(self, name: str) -> IO[str]:
+        """
+        Open a file in this source for reading as text.
+
+        Parameters
+        ----------
+        name: str
+            The relative path of the file (using "/" as the separator).
+
+        Returns
+        -------
+        file: IO[str]
+            The opened file.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the file is not present in this source.
+        """
+        if not self.exists(name):
+            raise FileNotFoundError(f"{name} was not found in {self}.")
+
+        return self._open(name)
+
+    def close(self) -> None:
+        """
+        Release any resources held by this source.
+        """
+
+    @abc.abstractmethod
+    def _open(self, name: str) -> IO[str]:
+        """
+        Open a file that is known to exist in this source.
+        """
+
+
+class DirectorySource(DataSource):
+    """
+    Load data files from a directory.
+
+    Parameters
+    ----------
+    root: str
+        The directory containing the data files.
+    """
+
+    def __init__(self, root: str) -> None:
+
+        # check that the directory exists
+        if not isdir(root):
+            raise ValueError(f"{root} is not a directory.")
+
+        self.root = root
+
+        # and index every file in the directory
+        names = set()
+        for path, _, files in os.walk(root):
+            relative = os.path.relpath(path, root)
+            for filename in files:
+                name = filename if relative == "." else join(relative, filename)
+                names.add(name.replace(os.sep, "/"))
+
+        super().__init__(frozenset(names))
+
+    def __repr__(self) -> str:
+        return f"DirectorySource({self.root!r})"
+
+    def _open(self, name: str) -> IO[str]:
+        return open(join(self.root, *name.split("/")))
+
+
+class ArchiveSource(DataSource):
+    """
+    Load data files in place from a single zip or tar archive.
+
+    By default, if every file in the archive is stored under a single
+    top-level directory (i.e. "data/") that is not itself part of the data
+    layout (i.e. "anita4/" or "responses/"), that directory is removed
+    from the names.
+
+    Parameters
+    ----------
+    filename: str
+        The path of the zip or tar (optionally compressed) archive.
+    prefix: Optional[str]
+        The directory in the archive that contains the data files, "" for
+        the root of the archive, or None to detect it automatically.
+    """
+
+    def __init__(self, filename: str, prefix: Optional[str] = None) -> None:
+        self.filename = filename
+
+        # archives are not safe to read concurrently so we use a lock
+        self._lock = threading.Lock()
+
+        # open the archive and get the names of every file
+        self._archive: Union[zipfile.ZipFile, tarfile.TarFile]
+        if zipfile.is_zipfile(filename):
+            self._archive = zipfile.ZipFile(filename)
+            members = [
+                info.filename for info in self._archive.infolist() if not info.is_dir()
+            ]
+        elif tarfile.is_tarfile(filename):
+            self._archive = tarfile.open(filename)
+            members = [
+                info.name for info in self._archive.getmembers() if info.isfile()
+            ]
+        else:
+            raise ValueError(f"{filename} is not a zip or tar archive.")
+
+        # check if every file is stored under a single top-level directory
+        if prefix is None:
+            tops = {member.split("/", 1)[0] for member in members}
+            top = tops.pop() if len(tops) == 1 else ""
+            nested = all("/" in member for member in members)
+            prefix = top if nested and not _LAYOUT.fullmatch(top) else ""
+
+        # make sure the prefix is a directory
+        prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+
+        # and map the name of every file under the prefix onto its archive member
+        start = len(prefix)
+        self._members: Dict[str, str] = {
+            member[start:]: member for member in members if member.startswith(prefix)
+        }
+
+        super().__init__(frozenset(self._members))
+
+    def __repr__(self) -> str:
+        return f"ArchiveSource({self.filename!r})"
+
+    def close(self) -> None:
+        with self._lock:
+            self._archive.close()
+
+    def _open(self, name: str) -> IO[str]:
+
+        # read the contents of this member while holding the lock
+        with self._lock:
+            if isinstance(self._archive, zipfile.ZipFile):
+                contents = self._archive.read(self._members[name])
+            else:
+                member = self._archive.extractfile(self._members[name])
+                assert member is not None
+                contents = member.read()
+
+        return io.StringIO(contents.decode())
+
+
+# the currently selected data source
+_SOURCE: Optional[DataSource] = None
+
+# the lock protecting the current data source
+_LOCK = threading.Lock()
+
+
+def open_source(location: str) -> DataSource:
+    """
+    Open a data source from a directory or archive path.
+
+    Parameters
+    ----------
+    location: str
+        The path of a data directory or a zip/tar archive.
+
+    Returns
+    -------
+    source: DataSource
+        The opened data source.
+    """
+    return DirectorySource(location) if isdir(location) else ArchiveSource(location)
+
+
+def get_source() -> DataSource:
+    """
+    Return the current data source.
+
+    If no source has been selected with `set_source`, the source is opened
+    from the `ANITACOSMICRAYS_DATA` environment variable (if set) or from
+    the data directory distributed with this package.
+
+    Returns
+    -------
+    source: DataSource
+        The current data source.
+    """
+    global _SOURCE
+
+    with _LOCK:
+        if _SOURCE is None:
+            _SOURCE = open_source(
+                os.environ.get(ENVIRONMENT_VARIABLE, PACKAGE_DATA_DIR)
+            )
+        return _SOURCE
+
+
+def set_source(source: Optional[Union[str, DataSource]]) -> None:
+    """
+    Select the data source used by every loader in this package.
+
+    Every cached array is cleared, and the previous source is closed, when
+    the data source is changed.
+
+    Parameters
+    ----------
+    source: Optional[Union[str, DataSource]]
+        A data source, the path of a data directory or zip/tar archive, or
+        None to restore the default data source.
+    """
+    global _SOURCE
+
+    with _LOCK:
+        previous = _SOURCE
+        _SOURCE = open_source(source) if isinstance(source, str) else source
+
+    # remove any data loaded from the previous source
+    cache.clear_caches()
+
+    # and release the previous source if it has been replaced
+    if previous is not None and previous is not _SOURCE:
+        previous.close()
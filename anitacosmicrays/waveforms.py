@@ -1,26 +1,39 @@
 """
 This file provides functions for loading waveforms from ANITA cosmic ray events.
 """
-import os.path as path
+from typing import Sequence, Tuple, Union
 
 import numpy as np
-from cachetools import cached
+from cachetools.keys import hashkey
 
-__all__ = ["get_waveforms"]
+from .cache import cached
+from .dtypes import DTypeLike, float_dtype
+from .sources import get_source
 
-# the location of the events files
-WVFM_DIR = path.join(path.dirname(path.dirname(__file__)), "data")
+__all__ = ["get_waveforms", "stack_waveforms"]
 
 
-@cached(cache={})
-def get_waveforms(flight: int, event: int) -> np.ndarray:
+def _key(flight: int, event: int, dtype: DTypeLike = np.float64) -> tuple:
+    """
+    Construct the cache key for a waveform so that equivalent dtypes
+    (i.e. float, "float64", and np.float64) share a cache entry.
+    """
+    return hashkey(flight, event, float_dtype(dtype))
+
+
+@cached(key=_key)
+def get_waveforms(flight: int, event: int, dtype: DTypeLike = np.float64) -> np.ndarray:
     """
     Return the waveform for a given A4 CR event sampled at 20GSa/s.
 
     Parameters
     ----------
+    flight: int
+        The ANITA flight to load.
     event: int
         The event ID to load.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveforms i.e. np.float32.
 
     Returns
     -------
@@ -34,29 +47,35 @@ def get_waveforms(flight: int, event: int) -> np.ndarray:
     """
 
     # construct the filename
-    filename: str = path.join(WVFM_DIR, *(f"anita{flight}", f"event{event}.waveform"))
+    filename = f"anita{flight}/event{event}.waveform"
 
     # check that the file exists
-    if not path.exists(filename):
+    source = get_source()
+    if not source.exists(filename):
         raise ValueError(f"{event} was not found for ANITA{flight}.")
 
     # load the waveform
-    waveforms: np.ndarray = np.genfromtxt(filename, names=True)
+    with source.open(filename) as f:
+        waveforms: np.ndarray = np.genfromtxt(f, names=True, dtype=float_dtype(dtype))
 
     # and return the resampled waveform
     return waveforms
 
 
-@cached(cache={})
-def get_csw(flight: int, event: int) -> np.ndarray:
+@cached(key=_key)
+def get_csw(flight: int, event: int, dtype: DTypeLike = np.float64) -> np.ndarray:
     """
     Return the coherently summed waveform for a given
     A4 CR event sampled at 20GSa/s.
 
     Parameters
     ----------
+    flight: int
+        The ANITA flight to load.
     event: int
         The event ID to load.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveforms i.e. np.float32.
 
     Returns
     -------
@@ -70,29 +89,37 @@ def get_csw(flight: int, event: int) -> np.ndarray:
     """
 
     # construct the filename
-    filename: str = path.join(WVFM_DIR, *(f"anita{flight}", f"csw{event}.waveform"))
+    filename = f"anita{flight}/csw{event}.waveform"
 
     # check that the file exists
-    if not path.exists(filename):
+    source = get_source()
+    if not source.exists(filename):
         raise ValueError(f"{event} CSW was not found for ANITA{flight}.")
 
     # load the waveform
-    waveforms: np.ndarray = np.genfromtxt(filename, names=True)
+    with source.open(filename) as f:
+        waveforms: np.ndarray = np.genfromtxt(f, names=True, dtype=float_dtype(dtype))
 
     # and return the resampled waveform
     return waveforms
 
 
-@cached(cache={})
-def get_deconvolved(flight: int, event: int) -> np.ndarray:
+@cached(key=_key)
+def get_deconvolved(
+    flight: int, event: int, dtype: DTypeLike = np.float64
+) -> np.ndarray:
     """
     Return the deconvolved electric field waveform for a given
     ANITA CR event.
 
     Parameters
     ----------
+    flight: int
+        The ANITA flight to load.
     event: int
         The event ID to load.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveforms i.e. np.float32.
 
     Returns
     -------
@@ -106,18 +133,94 @@ def get_deconvolved(flight: int, event: int) -> np.ndarray:
     """
 
     # construct the filename
-    filename: str = path.join(
-        WVFM_DIR, *(f"anita{flight}", f"deconvolved{event}.waveform")
-    )
+    filename = f"anita{flight}/deconvolved{event}.waveform"
 
     # check that the file exists
-    if not path.exists(filename):
+    source = get_source()
+    if not source.exists(filename):
         raise ValueError(
             f"{event} deconvolved electric field was not found for ANITA{flight}."
         )
 
     # load the waveform
-    waveforms: np.ndarray = np.genfromtxt(filename, names=["time", "field"])
+    with source.open(filename) as f:
+        waveforms: np.ndarray = np.genfromtxt(
+            f, names=["time", "field"], dtype=float_dtype(dtype)
+        )
 
     # and return the resampled waveform
     return waveforms
+
+
+def stack_waveforms(
+    flight: int,
+    events: Sequence[int],
+    channels: Union[str, Sequence[str]] = "all",
+    dtype: DTypeLike = np.float64,
+) -> Tuple[np.ndarray, np.ndarray, Tuple[str, ...]]:
+    """
+    Stack the waveforms of many events into a single dense array.
+
+    Parameters
+    ----------
+    flight: int
+        The ANITA flight to load.
+    events: Sequence[int]
+        The event IDs to load.
+    channels: Union[str, Sequence[str]]
+        The channel labels, a single channel label, or "all" for every channel.
+    dtype: DTypeLike
+        The floating-point dtype of the returned waveforms i.e. np.float32.
+
+    Returns
+    -------
+    time: np.ndarray
+        The sample times (in ns) shared by every waveform.
+    block: np.ndarray
+        The (n_events x n_channels x n_samples) waveforms (in mV).
+    channels: Tuple[str, ...]
+        The channel label for each entry along the second axis of `block`.
+
+    Raises
+    ------
+    ValueError
+        If an event or channel cannot be found, or the events are
+        sampled on different time axes.
+    """
+
+    # there must be at least one event to stack
+    if len(events) == 0:
+        raise ValueError("At least one event must be requested.")
+
+    # load the first event to get the available channels and time axis
+    first: np.ndarray = get_waveforms(flight, events[0], dtype)
+    time: np.ndarray = first["time"]
+
+    # get the channels that we want to stack
+    available = tuple(name for name in first.dtype.names or () if name != "time")
+    if isinstance(channels, str):
+        channels = available if channels == "all" else (channels,)
+    selected = tuple(channels)
+
+    # check that every channel is present
+    unknown = [channel for channel in selected if channel not in available]
+    if unknown:
+        raise ValueError(f"Unknown channels for ANITA{flight}: {', '.join(unknown)}")
+
+    # allocate the block once
+    block = np.zeros((len(events), len(selected), time.size), dtype=time.dtype)
+
+    # and fill it event-by-event
+    for i, event in enumerate(events):
+        waveforms: np.ndarray = get_waveforms(flight, event, dtype)
+
+        # check that this event is on the same time axis
+        if waveforms.size != time.size or np.any(waveforms["time"] != time):
+            raise ValueError(
+                f"{event} is not sampled on the same times as {events[0]}."
+            )
+
+        for j, channel in enumerate(selected):
+            block[i, j, :] = waveforms[channel]
+
+    return time, block, selected
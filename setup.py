@@ -34,12 +34,15 @@ setup(
     keywords=["anita", "cosmic rays", "physics", "radio"],
     packages=["anitacosmicrays"],
     python_requires=">=3.6*, <4",
-    install_requires=["numpy", "cachetools"],
+    install_requires=["numpy>=1.17", "cachetools"],
     extras_require={
         "test": ["pytest", "black", "mypy",
                  "coverage", "pytest-cov", "flake8"],
     },
     scripts=[],
+    entry_points={
+        "console_scripts": ["anitacosmicrays-export=anitacosmicrays.export:main"],
+    },
     project_urls={},
     include_package_data=True,
 )
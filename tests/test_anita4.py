@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 
 import anitacosmicrays.anita4 as anita4
@@ -104,3 +105,32 @@ def test_get_nonexistent_waveform():
 
     with pytest.raises(ValueError):
         _ = anita4.get_waveforms(12313412312)
+
+
+def test_get_waveforms_float32():
+    """
+    Check that waveforms can be loaded directly in single precision.
+    """
+
+    # load the waveforms in both precisions
+    double = anita4.get_waveforms(A4EVENTS[0])
+    single = anita4.get_waveforms(A4EVENTS[0], dtype=np.float32)
+
+    # check that every field has been stored in single precision
+    assert all(single.dtype[name] == np.float32 for name in single.dtype.names)
+    assert all(double.dtype[name] == np.float64 for name in double.dtype.names)
+
+    # and that they agree to single precision
+    np.testing.assert_allclose(single["01TH"], double["01TH"], rtol=1e-6)
+
+    # check that the cache is keyed by the normalized dtype
+    assert anita4.get_waveforms(A4EVENTS[0], dtype="float32") is single
+    assert anita4.get_waveforms(A4EVENTS[0], dtype=float) is double
+
+    # and the CSW and deconvolved waveforms
+    assert anita4.get_csw(A4EVENTS[0], np.float32)["HPOL"].dtype == np.float32
+    assert anita4.get_deconvolved(A4EVENTS[0], np.float32)["field"].dtype == np.float32
+
+    # check that we don't accept non-floating types
+    with pytest.raises(ValueError):
+        _ = anita4.get_waveforms(A4EVENTS[0], dtype=int)
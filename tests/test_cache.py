@@ -0,0 +1,202 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import anitacosmicrays
+import anitacosmicrays.cache as cache
+
+# the number of threads used to hammer the loaders
+NTHREADS = 32
+
+
+def test_single_flight() -> None:
+    """
+    Check that concurrent requests for the same key only compute it once.
+    """
+
+    # count the number of calls for each key
+    calls = {"count": 0}
+    release = threading.Event()
+
+    @cache.cached()
+    def load(key: int) -> object:
+        calls["count"] += 1
+        release.wait(5.0)  # hold the load until every thread is waiting
+        return object()
+
+    with ThreadPoolExecutor(NTHREADS) as executor:
+        futures = [executor.submit(load, 1) for _ in range(NTHREADS)]
+        release.set()
+        results = [future.result() for future in futures]
+
+    # every thread must get the same object from a single load
+    assert calls["count"] == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_different_keys_in_parallel() -> None:
+    """
+    Check that loads of different keys are not serialized.
+    """
+
+    # both loads must be in progress at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5.0)
+
+    @cache.cached()
+    def load(key: int) -> int:
+        barrier.wait()
+        return key
+
+    with ThreadPoolExecutor(2) as executor:
+        assert list(executor.map(load, [1, 2])) == [1, 2]
+
+
+def test_errors_are_shared_and_not_cached() -> None:
+    """
+    Check that exceptions propagate to waiters and are retried later.
+    """
+
+    calls = {"count": 0}
+    release = threading.Event()
+
+    @cache.cached()
+    def load(key: int) -> int:
+        calls["count"] += 1
+        release.wait(5.0)
+        if calls["count"] == 1:
+            raise ValueError("failed")
+        return key
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(load, 1) for _ in range(4)]
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result()
+
+    # the failure must not have been cached
+    assert load(1) == 1
+    assert calls["count"] == 2
+
+
+def test_clear_during_load() -> None:
+    """
+    Check that loads in flight when the caches are cleared are not stored.
+    """
+
+    calls = {"count": 0}
+    started = threading.Event()
+    release = threading.Event()
+
+    @cache.cached()
+    def load(key: int) -> int:
+        calls["count"] += 1
+        count = calls["count"]
+        if count == 1:
+            started.set()
+            release.wait(5.0)  # hold the first load until the caches are cleared
+        return count
+
+    with ThreadPoolExecutor(1) as executor:
+        stale = executor.submit(load, 1)
+        started.wait(5.0)
+
+        # clear the caches while the first load is in progress
+        cache.clear_caches()
+
+        # a new request must not wait for (or share) the stale load
+        assert load(1) == 2
+        release.set()
+
+        # the stale value is still returned to its caller
+        assert stale.result() == 1
+
+    # but was not stored in the cache
+    assert load(1) == 2
+    assert calls["count"] == 2
+
+
+def test_get_response_copies() -> None:
+    """
+    Check that modifying a response does not modify later responses.
+    """
+
+    response = anitacosmicrays.get_response(4, "01TH")
+    expected = response.copy()
+
+    response["response"][:] = 0.0
+    np.testing.assert_array_equal(anitacosmicrays.get_response(4, "01TH"), expected)
+
+
+def test_get_average_response_copies() -> None:
+    """
+    Check that modifying an average response does not modify later averages.
+    """
+
+    average = anitacosmicrays.get_average_response(4, ["01TH", "01TV"])
+    expected = average.copy()
+
+    average["response"][:] = 0.0
+    np.testing.assert_array_equal(
+        anitacosmicrays.get_average_response(4, ["01TH", "01TV"]), expected
+    )
+
+
+def test_stress_accessors(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Hammer the package accessors from many threads on a cold cache.
+    """
+
+    # start from a cold cache
+    cache.clear_caches()
+
+    # count the number of times that each file is parsed
+    parsed = []
+    lock = threading.Lock()
+    genfromtxt = np.genfromtxt
+
+    def counting(fname: object, *args: object, **kwargs: object) -> np.ndarray:
+        with lock:
+            parsed.append(getattr(fname, "name", fname))
+        return genfromtxt(fname, *args, **kwargs)
+
+    monkeypatch.setattr(np, "genfromtxt", counting)
+
+    # the events and accessors that we request
+    events = [4098827, 19848917, 66313236]
+    requests = [
+        (accessor, event)
+        for accessor in [
+            anitacosmicrays.get_waveforms,
+            anitacosmicrays.get_csw,
+            anitacosmicrays.get_deconvolved,
+        ]
+        for event in events
+    ] * NTHREADS
+
+    with ThreadPoolExecutor(NTHREADS) as executor:
+        results = list(executor.map(lambda req: (req, req[0](4, req[1])), requests))
+
+        # and hammer the event tables and responses at the same time
+        tables = list(executor.map(anitacosmicrays.get_events, [1, 3, 4] * NTHREADS))
+        responses = list(
+            executor.map(
+                lambda _: anitacosmicrays.get_response(4, "01TH"), range(NTHREADS)
+            )
+        )
+
+    # every waveform file, and the ANITA-1/3 tables, must be parsed exactly once
+    assert len(parsed) == len(set(parsed)) == 3 * len(events) + 2
+
+    # and every thread must have received the same cached array
+    first = {}
+    for req, result in results:
+        assert first.setdefault(req, result) is result
+    assert len({id(table) for table in tables}) == 3
+
+    # while every response is an equal, independent copy
+    assert len({id(response) for response in responses}) == NTHREADS
+    for response in responses:
+        np.testing.assert_array_equal(response, responses[0])
@@ -0,0 +1,188 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import anitacosmicrays
+import anitacosmicrays.export as export
+
+
+def test_export_roundtrip(tmp_path: str) -> None:
+    """
+    Check that exported products match the loaders after reopening.
+    """
+
+    # export a few events with a subset of channels
+    filename = os.path.join(str(tmp_path), "events.acr")
+    evids = [4098827, 19848917, 66313236]
+    nevents = export.export(
+        filename,
+        4,
+        evids=evids,
+        products=["waveforms", "csw", "deconvolved", "responses"],
+        channels=["01TH", "09MV"],
+        configs=["260_0_0", "260_375_0"],
+        metadata={"analysis": "test"},
+    )
+    assert nevents == 3
+
+    # reopen the file with memory mapping
+    exported = export.open_export(filename)
+    assert isinstance(exported["waveforms"], np.memmap)
+    assert exported.metadata["flight"] == 4
+    assert exported.metadata["analysis"] == "test"
+    assert exported.events.size == 3
+
+    # and check every product against the loaders
+    for evid in evids:
+        waveforms = anitacosmicrays.get_waveforms(4, evid)
+        stored = exported.get("waveforms", evid)
+        assert stored.dtype.names == ("time", "01TH", "09MV")
+        np.testing.assert_array_equal(stored["09MV"], waveforms["09MV"])
+        np.testing.assert_array_equal(
+            exported.get("csw", evid), anitacosmicrays.get_csw(4, evid)
+        )
+        np.testing.assert_array_equal(
+            exported.get("deconvolved", evid), anitacosmicrays.get_deconvolved(4, evid)
+        )
+        assert exported.events[exported.index[evid]]["id"] == evid
+
+    # check the responses
+    _, block, _ = anitacosmicrays.get_responses(4, "260_375_0", ["01TH", "09MV"])
+    np.testing.assert_array_equal(exported["responses"][1], block)
+
+    # check that every array is aligned within the file
+    with open(filename, "rb") as f:
+        f.seek(-8, 2)
+        offset = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+        f.seek(offset)
+        footer = json.loads(f.read()[:-8].decode())
+    assert all(
+        array["offset"] % export.ALIGNMENT == 0 for array in footer["arrays"].values()
+    )
+
+    # and that missing events raise an exception
+    with pytest.raises(ValueError):
+        exported.get("csw", 1234)
+
+
+def test_export_query(tmp_path: str) -> None:
+    """
+    Check that we can select events with a query in single precision.
+    """
+
+    filename = os.path.join(str(tmp_path), "query.acr")
+    export.export(
+        filename,
+        4,
+        query=lambda events: events["elevation"] < -30,
+        products=["csw"],
+        dtype=np.float32,
+    )
+
+    # check that we selected the right events
+    exported = export.open_export(filename)
+    events = anitacosmicrays.get_events(4)
+    np.testing.assert_array_equal(
+        exported.events["id"], events["id"][events["elevation"] < -30]
+    )
+    assert exported["csw"].dtype["HPOL"] == np.float32
+    assert "waveforms" not in exported
+
+    # and that an empty selection raises an exception
+    with pytest.raises(ValueError):
+        export.export(filename, 4, query=lambda events: events["elevation"] > 90)
+
+
+def test_export_single_channel(tmp_path: str) -> None:
+    """
+    Check that a single channel label is not split and that a failed export
+    leaves an existing file untouched.
+    """
+
+    filename = os.path.join(str(tmp_path), "single.acr")
+    export.export(
+        filename,
+        4,
+        evids=[4098827],
+        products=["waveforms", "responses"],
+        channels="01TH",
+    )
+
+    # check that we only exported the requested channel
+    exported = export.open_export(filename)
+    assert exported.metadata["channels"] == ["01TH"]
+    assert exported["waveforms"].dtype.names == ("time", "01TH")
+    assert exported["responses"].shape[:2] == (len(export.CONFIGS), 1)
+    del exported
+
+    # now attempt an export that fails part way through
+    with open(filename, "rb") as f:
+        contents = f.read()
+    with pytest.raises(ValueError):
+        export.export(filename, 4, evids=[4098827], channels="99XH")
+
+    # the original file must be unchanged and no temporary files left behind
+    with open(filename, "rb") as f:
+        assert f.read() == contents
+    assert os.listdir(str(tmp_path)) == ["single.acr"]
+
+
+def test_export_validation(tmp_path: str) -> None:
+    """
+    Check the default products and the validation of the arguments.
+    """
+
+    # by default, only the products available for the flight are exported
+    filename = os.path.join(str(tmp_path), "anita3.acr")
+    export.export(filename, 3, query=lambda events: events["elevation"] < -30)
+    exported = export.open_export(filename)
+    assert exported.metadata["products"] == ["deconvolved"]
+    assert exported.names == ["events", "deconvolved"]
+    del exported
+
+    # explicitly requesting an unavailable product is an error
+    with pytest.raises(ValueError, match="does not provide waveforms"):
+        export.export(filename, 3, products=["waveforms"])
+
+    # as is exporting responses without any configurations
+    with pytest.raises(ValueError):
+        export.export(filename, 4, products=["responses"], configs=[])
+
+    # duplicate products are only written once
+    filename = os.path.join(str(tmp_path), "anita4.acr")
+    export.export(filename, 4, evids=[4098827], products=["csw", "responses", "csw"])
+    exported = export.open_export(filename)
+    assert exported.metadata["products"] == ["csw", "responses"]
+    assert exported.names == ["events", "csw", "responses_time", "responses"]
+
+    # and only per-event products can be selected by event
+    for name in ["events", "responses", "responses_time"]:
+        with pytest.raises(ValueError):
+            exported.get(name, 4098827)
+
+
+def test_export_cli(tmp_path: str) -> None:
+    """
+    Check the command-line interface.
+    """
+
+    filename = os.path.join(str(tmp_path), "cli.acr")
+    export.main(
+        [filename, "--flight", "3", "--where", "elevation < -30"]
+        + ["--products", "deconvolved"]
+    )
+
+    # check that we selected the right events
+    exported = export.open_export(filename)
+    events = anitacosmicrays.get_events(3)
+    np.testing.assert_array_equal(
+        exported.events["id"], events["id"][events["elevation"] < -30]
+    )
+
+    # and check the deconvolved fields of the first event
+    evid = int(exported.events["id"][0])
+    np.testing.assert_array_equal(
+        exported.get("deconvolved", evid), anitacosmicrays.get_deconvolved(3, evid)
+    )
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import anitacosmicrays.anita4 as anita4
+import anitacosmicrays.features as features
+
+
+def test_summarize_anita4() -> None:
+    """
+    Check that the summary features agree with a per-channel calculation.
+    """
+
+    # compute every feature for ANITA-4
+    summary = features.summarize(4)
+
+    # check that the event table has been joined
+    events = anita4.get_events()
+    assert summary.size == events.size
+    np.testing.assert_array_equal(summary["id"], events["id"])
+    np.testing.assert_array_equal(summary["elevation"], events["elevation"])
+
+    # check the shapes of the features
+    assert summary["peak_to_peak"].shape == (events.size, 96)
+    assert summary["polarization"].shape == (events.size, 48)
+    assert summary["csw_polarization"].shape == (events.size,)
+
+    # and compare against a manual calculation for a single channel
+    idx = 3
+    waveform = anita4.get_waveforms(summary["id"][idx])
+    channel = features.CHANNELS.index("05MV")
+    noise = waveform["time"] < 20.0
+
+    p2p = np.ptp(waveform["05MV"])
+    rms = np.sqrt(np.mean(waveform["05MV"][noise] ** 2))
+    assert summary["peak_to_peak"][idx, channel] == pytest.approx(p2p)
+    assert summary["rms"][idx, channel] == pytest.approx(rms)
+    assert summary["snr"][idx, channel] == pytest.approx(p2p / (2 * rms))
+    assert summary["envelope"][idx, channel] >= np.max(np.abs(waveform["05MV"]))
+
+    # check that modifying the summary does not modify later summaries
+    expected = summary["snr"].copy()
+    summary["snr"][:] = -1.0
+    np.testing.assert_array_equal(features.summarize(4)["snr"], expected)
+
+
+def test_summarize_subset() -> None:
+    """
+    Check that we can request a subset of features.
+    """
+
+    summary = features.summarize(4, ["snr", "csw_polarization"])
+    assert "snr" in summary.dtype.names
+    assert "envelope" not in summary.dtype.names
+
+    # repeated features are only included once
+    repeated = features.summarize(4, ["snr", "csw_polarization", "snr"])
+    assert repeated.dtype.names == summary.dtype.names
+    assert features.summarize(4, "snr").dtype.names[-1] == "snr"
+
+    with pytest.raises(ValueError):
+        features.summarize(4, ["curvature"])
+
+
+def test_hilbert_envelope() -> None:
+    """
+    Check the envelope of a pure tone and its polarization angle.
+    """
+
+    # a pure tone with an integer number of cycles has a flat envelope
+    t = np.arange(256)
+    tone = 3.0 * np.cos(2 * np.pi * 8 * t / t.size)
+    np.testing.assert_allclose(features.hilbert_envelope(tone), 3.0)
+
+    # and a 45-degree linearly polarized signal
+    assert features._polarization(tone, tone) == pytest.approx(45.0)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import anitacosmicrays.anita4 as anita4
+import anitacosmicrays.folding as folding
+import anitacosmicrays.responses as responses
+
+
+def test_fold_matches_convolution() -> None:
+    """
+    Check that folding at the response sample rate is a linear convolution.
+    """
+
+    # create two fields sampled at 10 GSa/s
+    rng = np.random.RandomState(42)
+    time = np.arange(200) * 0.1
+    fields = rng.normal(size=(2, time.size))
+
+    # and fold them through two channels and two configs without resampling
+    times, waveforms = folding.fold(
+        time, fields, config=["260_0_0", "260_375_0"], channels=["01TH", "09BV"], fs=10
+    )
+    assert waveforms.shape[:3] == (2, 2, 2)
+    np.testing.assert_allclose(np.diff(times), 0.1)
+
+    # compare against a direct convolution
+    response = responses.get_response(4, "09BV", "260_375_0")["response"]
+    expected = np.convolve(fields[1], response) * 0.1
+    assert waveforms.shape[-1] >= expected.size
+    np.testing.assert_allclose(waveforms[1, 1, 1, : expected.size], expected, atol=1e-9)
+
+    # and check that the interpolation keeps the final sample of the fields
+    np.testing.assert_allclose(folding._interpolate(time, fields, 0.1), fields)
+
+
+def test_fold_digitizer() -> None:
+    """
+    Check that we can fold a deconvolved field onto the digitizer grid.
+    """
+
+    # load a deconvolved field
+    field = anita4.get_deconvolved(19848917)
+
+    # and fold it through every channel
+    times, waveforms = folding.fold(field["time"], field["field"])
+    assert waveforms.shape[:3] == (1, 1, 96)
+    np.testing.assert_allclose(np.diff(times), 1.0 / folding.DIGITIZER_FS)
+
+    # check that the result is consistent with folding at 10 GSa/s
+    fine_times, fine = folding.fold(field["time"], field["field"], fs=10.0)
+    assert np.max(np.abs(waveforms)) == pytest.approx(np.max(np.abs(fine)), rel=0.2)
+
+    # and that we can fold in single precision
+    _, single = folding.fold(field["time"], field["field"], dtype=np.float32)
+    assert single.dtype == np.float32
+    np.testing.assert_allclose(single, waveforms, atol=1e-3 * np.max(waveforms))
+
+
+def test_fold_ensemble() -> None:
+    """
+    Check that noisy ensembles are reproducible and have the requested noise.
+    """
+
+    # load a deconvolved field
+    field = anita4.get_deconvolved(19848917)
+
+    # generate the ensemble with a small and large chunk size
+    kwargs = dict(channels=["01TH", "01TV"], seed=11)
+    small = list(
+        folding.fold_ensemble(
+            field["time"], field["field"], 5, 10.0, memory=1, **kwargs
+        )
+    )
+    large = list(
+        folding.fold_ensemble(field["time"], field["field"], 5, 10.0, **kwargs)
+    )
+
+    # check that we got the expected number of chunks
+    assert len(small) == 5 and len(large) == 1
+
+    # and that the ensemble is independent of the chunk size
+    ensemble = np.concatenate([waveforms for _, waveforms in small])
+    np.testing.assert_array_equal(ensemble, large[0][1])
+
+    # and check the RMS of the injected noise
+    _, signal = folding.fold(field["time"], field["field"], channels=["01TH", "01TV"])
+    assert np.std(ensemble - signal) == pytest.approx(10.0, rel=0.05)
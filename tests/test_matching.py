@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import anitacosmicrays.matching as matching
+import anitacosmicrays.waveforms as waveforms
+
+
+def test_match_templates_brute_force() -> None:
+    """
+    Check that the batched correlations agree with a brute-force np.correlate.
+    """
+
+    # create some random waveforms and templates
+    rng = np.random.RandomState(1234)
+    block = rng.normal(size=(3, 4, 50))
+    templates = rng.normal(size=(5, 17))
+
+    # compute the peaks and lags with a tiny memory limit to force chunking
+    peaks, lags = matching.match_templates(templates, block, memory=1)
+
+    # check the shapes
+    assert peaks.shape == (3, 4, 5)
+    assert lags.shape == (3, 4, 5)
+
+    # and compare every combination against a windowed np.correlate
+    for idx in np.ndindex(*block.shape[:-1]):
+        x = block[idx]
+        for k, template in enumerate(templates):
+            t = template - template.mean()
+            index = np.arange(t.size) + np.arange(x.size - t.size + 1)[:, None]
+            windows = x[index] - x[index].mean(axis=-1, keepdims=True)
+            ncc = np.correlate(x, t, "valid") / np.linalg.norm(t)
+            ncc /= np.linalg.norm(windows, axis=-1)
+            imax = np.argmax(np.abs(ncc))
+            assert peaks[idx + (k,)] == pytest.approx(ncc[imax])
+            assert lags[idx + (k,)] == imax
+
+    # an offset and scaled copy of a template has a peak of 1 for any length
+    for nsamples in [100, 1000]:
+        waveform = np.zeros(nsamples)
+        waveform[40:57] = 3.0 * templates[0] + 2.0
+        peaks, lags = matching.match_templates(templates[:1], waveform)
+        assert peaks[0] == pytest.approx(1.0)
+        assert lags[0] == 40
+
+    # and templates can't be longer than the waveforms
+    with pytest.raises(ValueError):
+        matching.prepare_templates(templates, 10)
+
+
+def test_match_templates_recovers_injection() -> None:
+    """
+    Check that we recover the lag and amplitude of an injected template.
+    """
+
+    # load a real ANITA-4 event
+    time, block, channels = waveforms.stack_waveforms(4, [4098827], ["01TH", "01TV"])
+    assert block.shape == (1, 2, time.size)
+
+    # check that a single channel label is not split into characters
+    _, single, labels = waveforms.stack_waveforms(4, [4098827], "01TV")
+    assert labels == ("01TV",)
+    np.testing.assert_array_equal(single[:, 0], block[:, 1])
+
+    # create a template from a Gaussian-modulated sinusoid
+    t = np.arange(64)
+    template = np.exp(-(((t - 32) / 6.0) ** 2)) * np.sin(2 * np.pi * t / 8.0)
+
+    # and inject it, inverted and much brighter than the noise, into a channel
+    block[0, 1, 100:164] -= 1e4 * template
+
+    # precompute the template bank and match
+    bank = matching.prepare_templates(template, time.size)
+    peaks, lags = matching.match_templates(bank, block)
+
+    # check that we found the injected template
+    assert lags[0, 1, 0] == 100
+    assert peaks[0, 1, 0] < -0.99
+
+    # and that the bank can't be used for other lengths
+    with pytest.raises(ValueError):
+        matching.match_templates(bank, block[..., :100])
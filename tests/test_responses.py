@@ -1,6 +1,10 @@
+import os
+
 import numpy as np
+import pytest
 
 import anitacosmicrays.responses as responses
+import anitacosmicrays.sources as sources
 
 
 def test_get_responses_anita4() -> None:
@@ -40,3 +44,167 @@ def test_get_responses_anita4() -> None:
 
     # and the overall average
     _ = responses.get_response(4, "average")
+
+
+def test_get_average_response_anita4() -> None:
+    """
+    Check that custom averages match a Python-level average
+    of the individual channel responses.
+    """
+
+    # select the top-ring H-pol channels
+    channels = responses.select_channels(ring="T", pol="H")
+    assert len(channels) == 16
+
+    # compute the average in one call
+    average = responses.get_average_response(4, channels, config="260_375_0")
+
+    # and compare it against a manual average
+    manual = np.mean(
+        [responses.get_response(4, ch, "260_375_0")["response"] for ch in channels],
+        axis=0,
+    )
+    np.testing.assert_allclose(average["response"], manual)
+    np.testing.assert_allclose(
+        average["time"], responses.get_response(4, channels[0])["time"]
+    )
+
+    # a single unit weight should reproduce the channel itself
+    weights = np.zeros(len(channels))
+    weights[3] = 1.0
+    weighted = responses.get_average_response(4, channels, weights=weights)
+    np.testing.assert_allclose(
+        weighted["response"], responses.get_response(4, channels[3])["response"]
+    )
+
+    # and check that the frequency-domain average is the transform of the
+    # time-domain average
+    spectrum = responses.get_average_response(
+        4, channels, config="260_375_0", domain="frequency"
+    )
+    np.testing.assert_allclose(
+        spectrum["response"], np.fft.rfft(average["response"]) / responses.FS
+    )
+    np.testing.assert_allclose(
+        spectrum["freq"], np.fft.rfftfreq(average.size, d=1.0 / responses.FS)
+    )
+
+
+def test_get_average_response_invalid() -> None:
+    """
+    Check that invalid channels and weights raise exceptions.
+    """
+
+    with pytest.raises(ValueError):
+        responses.get_average_response(4, ["01TH", "17TH"])
+
+    with pytest.raises(ValueError):
+        responses.get_average_response(4, ["01TH", "01TV"], weights=[1.0])
+
+    with pytest.raises(ValueError):
+        responses.get_average_response(4, ["01TH", "01TV"], weights=[1.0, -1.0])
+
+    with pytest.raises(ValueError):
+        responses.get_average_response(4, "all", domain="phase")
+
+
+def test_select_channels_numpy_phi() -> None:
+    """
+    Check that phi sectors can be given as NumPy integers.
+    """
+    phi = np.arange(1, 17)[2]
+    assert responses.select_channels(phi, ring="T") == ("03TH", "03TV")
+
+
+def test_get_responses_bulk_anita4() -> None:
+    """
+    Check that bulk-loaded responses match the individual responses.
+    """
+
+    # load every channel for a given config
+    time, block, channels = responses.get_responses(4, "260_0_460")
+
+    # check the shape of the block
+    assert channels == responses.CHANNELS
+    assert block.shape == (len(channels), time.size)
+
+    # and check every channel against the individual loader
+    for i, channel in enumerate(channels):
+        response = responses.get_response(4, channel, "260_0_460")
+        np.testing.assert_array_equal(response["time"], time)
+        np.testing.assert_array_equal(response["response"], block[i, :])
+
+    # check that we can load a subset of channels
+    _, subset, channels = responses.get_responses(4, "260_0_460", ["03MV", "01TH"])
+    assert channels == ("03MV", "01TH")
+    np.testing.assert_array_equal(subset[1, :], block[0, :])
+
+    # that the unit is cached
+    assert responses.get_responses(4, "260_0_460")[1] is block
+
+    # and that the shared arrays can't be modified in place
+    for array in (time, block, subset):
+        with pytest.raises(ValueError):
+            array[0] = 0.0
+
+
+def test_get_responses_float32() -> None:
+    """
+    Check that responses can be loaded directly in single precision.
+    """
+
+    # load a single channel
+    response = responses.get_response(4, "01TH", dtype=np.float32)
+    assert response["response"].dtype == np.float32
+
+    # the bulk-loaded block
+    time, block, _ = responses.get_responses(4, dtype=np.float32)
+    assert time.dtype == np.float32 and block.dtype == np.float32
+
+    # and the averages in both domains
+    average = responses.get_average_response(4, weights=np.ones(96), dtype="float32")
+    assert average["response"].dtype == np.float32
+    spectrum = responses.get_average_response(4, domain="frequency", dtype=np.float32)
+    assert spectrum["response"].dtype == np.complex64
+
+
+def test_get_responses_unequal_lengths(tmp_path: str) -> None:
+    """
+    Check that files of different lengths are parsed independently and that
+    responses sampled at different times are rejected.
+    """
+
+    # create a data directory with files of different lengths
+    load_dir = os.path.join(str(tmp_path), "responses", "anita4", "notches_260_0_0")
+    os.makedirs(load_dir)
+    for channel, start, nsamples in [("01TH", 0, 1001), ("01TV", 0, 1003)]:
+        time = start + np.arange(nsamples) / responses.FS
+        np.savetxt(
+            os.path.join(load_dir, f"{channel}.imp"),
+            np.stack([time, np.arange(nsamples)], axis=-1),
+        )
+
+    try:
+        sources.set_source(str(tmp_path))
+
+        # every row must start at the beginning of its own file
+        time, block, channels = responses.get_responses(4, channels=["01TH", "01TV"])
+        assert channels == ("01TH", "01TV")
+        np.testing.assert_array_equal(block[0], np.arange(time.size))
+        np.testing.assert_array_equal(block[1], np.arange(time.size))
+
+        # and missing channels are reported
+        with pytest.raises(FileNotFoundError):
+            responses.get_responses(4, channels="02TH")
+
+        # now shift the time axis of one of the files
+        np.savetxt(
+            os.path.join(load_dir, "01TV.imp"),
+            np.stack([0.2 + np.arange(1003) / responses.FS, np.arange(1003)], -1),
+        )
+        sources.set_source(str(tmp_path))
+
+        with pytest.raises(ValueError):
+            responses.get_responses(4, channels=["01TH", "01TV"])
+    finally:
+        sources.set_source(None)
@@ -0,0 +1,166 @@
+import os
+import tarfile
+import zipfile
+from typing import Iterator
+
+import numpy as np
+import pytest
+
+import anitacosmicrays
+import anitacosmicrays.sources as sources
+
+# the files that we copy into each test archive
+FILES = [
+    "a4events.dat",
+    "anita4/event4098827.waveform",
+    "anita4/csw4098827.waveform",
+    "responses/anita4/notches_260_0_0/01TH.imp",
+    "responses/anita4/notches_260_0_0/01TV.imp",
+]
+
+
+@pytest.fixture(autouse=True)
+def restore_source() -> Iterator[None]:
+    """
+    Restore the default data source after every test.
+    """
+    yield
+    sources.set_source(None)
+
+
+def _check_source() -> None:
+    """
+    Check that the current data source returns the same data as the package.
+    """
+
+    # load the data from the current source
+    events = anitacosmicrays.get_events(4)
+    waveforms = anitacosmicrays.get_waveforms(4, 4098827)
+    csw = anitacosmicrays.get_csw(4, 4098827)
+    _, block, _ = anitacosmicrays.get_responses(4, channels=["01TH", "01TV"])
+
+    # and restore the package data
+    sources.set_source(None)
+
+    # and check that everything matches the package data
+    np.testing.assert_array_equal(events, anitacosmicrays.get_events(4))
+    np.testing.assert_array_equal(waveforms, anitacosmicrays.get_waveforms(4, 4098827))
+    np.testing.assert_array_equal(csw, anitacosmicrays.get_csw(4, 4098827))
+    np.testing.assert_array_equal(
+        block, anitacosmicrays.get_responses(4, channels=["01TH", "01TV"])[1]
+    )
+
+
+def test_default_source() -> None:
+    """
+    Check that the default source indexes the package data.
+    """
+    source = sources.get_source()
+    assert isinstance(source, sources.DirectorySource)
+    assert all(source.exists(name) for name in FILES)
+    assert not source.exists("anita4/event1.waveform")
+
+    with pytest.raises(FileNotFoundError):
+        source.open("anita4/event1.waveform")
+
+
+@pytest.mark.parametrize("mode", ["zip", "tar", "tar.gz"])
+def test_archive_source(tmp_path: str, mode: str) -> None:
+    """
+    Check that we can load data in place from zip and tar archives.
+    """
+
+    # the directory that contains the package data
+    root = sources.PACKAGE_DATA_DIR
+
+    # create the archive with every file under a top-level directory
+    filename = os.path.join(str(tmp_path), f"data.{mode}")
+    if mode == "zip":
+        with zipfile.ZipFile(filename, "w") as archive:
+            for name in FILES:
+                archive.write(os.path.join(root, name), f"data/{name}")
+    else:
+        with tarfile.open(filename, "w:gz" if mode == "tar.gz" else "w") as archive:
+            for name in FILES:
+                archive.add(os.path.join(root, name), f"data/{name}")
+
+    # select the archive and check that the top-level directory was removed
+    sources.set_source(filename)
+    assert sources.get_source().names == frozenset(FILES)
+
+    # check that missing events are still reported as errors
+    with pytest.raises(ValueError):
+        anitacosmicrays.get_waveforms(4, 19848917)
+
+    _check_source()
+
+
+def test_archive_prefix(tmp_path: str) -> None:
+    """
+    Check that top-level data directories are not removed from archives.
+    """
+
+    # create an archive that only contains ANITA-4 waveforms
+    names = [name for name in FILES if name.startswith("anita4/")]
+    filename = os.path.join(str(tmp_path), "anita4.zip")
+    with zipfile.ZipFile(filename, "w") as archive:
+        for name in names:
+            archive.write(os.path.join(sources.PACKAGE_DATA_DIR, name), name)
+
+    # the names must be unchanged
+    source = sources.ArchiveSource(filename)
+    assert source.names == frozenset(names)
+    source.close()
+
+    # and we can explicitly select a directory within the archive
+    source = sources.ArchiveSource(filename, prefix="anita4")
+    assert source.names == frozenset(name.split("/", 1)[1] for name in names)
+    source.close()
+
+
+def test_set_source_closes_previous(tmp_path: str) -> None:
+    """
+    Check that replacing an archive source closes it.
+    """
+
+    # create a small archive
+    filename = os.path.join(str(tmp_path), "data.zip")
+    with zipfile.ZipFile(filename, "w") as archive:
+        archive.write(os.path.join(sources.PACKAGE_DATA_DIR, FILES[0]), FILES[0])
+
+    # select the archive and then replace it
+    source = sources.ArchiveSource(filename)
+    sources.set_source(source)
+    sources.set_source(None)
+
+    # the archive must have been closed
+    assert isinstance(source._archive, zipfile.ZipFile)
+    assert source._archive.fp is None
+
+    # and the data source must be abstract
+    with pytest.raises(TypeError):
+        sources.DataSource(frozenset())  # type: ignore
+
+
+def test_environment_variable(tmp_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Check that the data source can be selected with an environment variable.
+    """
+
+    # create a directory containing a copy of the files
+    for name in FILES:
+        target = os.path.join(str(tmp_path), *name.split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(os.path.join(sources.PACKAGE_DATA_DIR, name)) as src:
+            with open(target, "w") as dst:
+                dst.write(src.read())
+
+    # select the directory through the environment
+    monkeypatch.setenv(sources.ENVIRONMENT_VARIABLE, str(tmp_path))
+    sources.set_source(None)
+    assert sources.get_source().names == frozenset(FILES)
+
+    # and check the data (restoring the default source in the process)
+    monkeypatch.delenv(sources.ENVIRONMENT_VARIABLE)
+    sources.set_source(str(tmp_path))
+    _check_source()